@@ -1,16 +1,24 @@
 # app.py
+import os
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from sqlalchemy import text
+from flask_migrate import Migrate, stamp, upgrade
+from sqlalchemy import inspect
 from models import User, db
 from constants import RDS_POSTGRESQL_DATAVASE_URI, SECRET_KEY, JWT_SECRET_KEY, UPLOAD_FOLDER, FRONTEND_SERVERS
 from blacklist import blacklist
-import nltk
 from socketio_module import init_socketio, socketio
-
-# Initialize the punkt tokenizer data
-nltk.download('punkt')
+from events import init_dispatcher
+from membership import init_membership
+from feed_cache import init_feed_cache
+from passwords import init_passwords
+from chat_log import init_chat_log
+from cleanup import cleanup, init_cleanup
+from presence import init_presence
+from changes import init_changes
+from database import init_database
+from instrumentation import init_instrumentation
 
 # Register Blueprints
 from auth import auth_bp, create_anonymous_user
@@ -22,6 +30,14 @@ from comment import comment_bp
 # from calculator import calculator_bp
 from group import group_bp
 from chat import chat_bp
+from search import search_bp
+from monitoring import monitoring_bp
+
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def include_in_migrations(name, type_, parent_names):
+    # The full-text search tables are created with raw SQL in their migration, not from the models
+    return not (type_ == 'table' and name.startswith('search_'))
 
 def create_app():
     app = Flask(__name__)
@@ -31,6 +47,86 @@ def create_app():
     app.config['SECRET_KEY'] = SECRET_KEY
     app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    # Largest request body, e.g. a feed photo upload; bigger requests get a 413
+    app.config['MAX_CONTENT_LENGTH'] = 20 * 1024 * 1024
+
+    # Feed photos: 'proxy' serves them from a local disk cache, 'redirect' sends clients to presigned S3 URLs
+    app.config['PHOTO_SERVE_MODE'] = 'proxy'
+    app.config['PHOTO_CACHE_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'cache')
+    app.config['PHOTO_CACHE_MAX_BYTES'] = 512 * 1024 * 1024
+    app.config['PHOTO_URL_EXPIRES'] = 3600
+
+    # Caption beautification: 'gemini' or the offline 'stub' model
+    app.config['BEAUTIFY_MODEL'] = 'gemini'
+    app.config['BEAUTIFY_CACHE_SIZE'] = 1024
+    app.config['BEAUTIFY_CACHE_TTL'] = 24 * 3600
+    app.config['BEAUTIFY_MAX_CONCURRENCY'] = 4
+    app.config['BEAUTIFY_TIMEOUT'] = 10
+
+    # Socket.IO fan-out: events are batched per room every SOCKETIO_FLUSH_INTERVAL seconds
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = None
+    app.config['SOCKETIO_FLUSH_INTERVAL'] = 0.05
+
+    # Seconds a cached group membership answer may be served without checking the database
+    app.config['MEMBERSHIP_CACHE_TTL'] = 60
+
+    # Rendered group feed pages, validated against the group's feed_version on every request
+    app.config['FEED_PAGE_CACHE_SIZE'] = 2000
+    app.config['FEED_PAGE_CACHE_TTL'] = 300
+
+    # Presence changes are batched into one event per group every PRESENCE_INTERVAL
+    # seconds; a typing indicator lasts PRESENCE_TYPING_TTL seconds unless repeated
+    app.config['PRESENCE_INTERVAL'] = 1.0
+    app.config['PRESENCE_TYPING_TTL'] = 5.0
+
+    # Entries kept per group in the change log behind /group/<code>/changes
+    app.config['CHANGE_LOG_SIZE'] = 1000
+
+    # Chat messages are emitted at once and written in batches every CHAT_FLUSH_INTERVAL
+    # seconds; the latest CHAT_BUFFER_SIZE messages of up to CHAT_BUFFER_GROUPS groups
+    # are served from memory. CHAT_ACK_MODE 'persisted' answers only after the write.
+    # Beyond CHAT_MAX_PENDING unwritten messages sends get a 503; failed writes are
+    # retried after a delay that doubles up to CHAT_RETRY_MAX_DELAY seconds
+    app.config['CHAT_BUFFER_SIZE'] = 200
+    app.config['CHAT_BUFFER_GROUPS'] = 1000
+    app.config['CHAT_FLUSH_INTERVAL'] = 0.2
+    app.config['CHAT_MAX_PENDING'] = 10000
+    app.config['CHAT_RETRY_MAX_DELAY'] = 30
+    app.config['CHAT_ACK_MODE'] = 'buffered'
+    app.config['CHAT_ACK_TIMEOUT'] = 5
+
+    # bcrypt cost of new hashes; existing ones are rehashed at login. Hashing runs on
+    # PASSWORD_HASH_WORKERS threads (0 hashes inline) and sheds load past MAX_PENDING
+    app.config['BCRYPT_LOG_ROUNDS'] = 12
+    app.config['PASSWORD_HASH_WORKERS'] = 4
+    app.config['PASSWORD_HASH_MAX_PENDING'] = 64
+
+    # Deleted groups and replaced or deleted feed photos are removed in the background,
+    # CLEANUP_CHUNK_SIZE rows per transaction, checking every CLEANUP_INTERVAL seconds while
+    # work is left; failed S3 deletions are retried after CLEANUP_RETRY_DELAY seconds, doubling
+    app.config['CLEANUP_INTERVAL'] = 5.0
+    app.config['CLEANUP_CHUNK_SIZE'] = 1000
+    app.config['CLEANUP_RETRY_DELAY'] = 30
+    app.config['CLEANUP_MAX_ATTEMPTS'] = 8
+
+    # Logouts reach other workers within REVOCATION_SYNC_INTERVAL seconds; expired
+    # revocations are purged in the background every REVOCATION_PURGE_INTERVAL seconds
+    app.config['REVOCATION_SYNC_INTERVAL'] = 1.0
+    app.config['REVOCATION_PURGE_INTERVAL'] = 300
+
+    # Connection pool (server databases) and per-connection settings
+    app.config['DB_POOL_SIZE'] = 10
+    app.config['DB_MAX_OVERFLOW'] = 20
+    app.config['DB_POOL_TIMEOUT'] = 30
+    app.config['DB_POOL_RECYCLE'] = 1800
+    app.config['DB_POOL_PRE_PING'] = True
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = 15000
+    app.config['SQLITE_JOURNAL_MODE'] = 'WAL'
+    app.config['SQLITE_SYNCHRONOUS'] = 'NORMAL'
+
+    # Per-request timings: Server-Timing header, /metrics histograms and a log of statements slower than the threshold
+    app.config['SERVER_TIMING_HEADER'] = True
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = 200
 
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 3600  # or any other value you prefer
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = 30 * 24 * 3600  # 30 days
@@ -39,26 +135,56 @@ def create_app():
     app.config['JWT_COOKIE_CSRF_PROTECT'] = True
     app.config['JWT_COOKIE_SAMESITE'] = 'Strict'
 
-    db.init_app(app)
+    # Any of the settings above can be overridden from the environment, e.g. FLASK_DB_POOL_SIZE=20
+    app.config.from_prefixed_env()
 
+    init_database(app)
+    # Schema changes are versioned in migrations/ and applied with `flask db upgrade`
+    Migrate(app, db, directory=MIGRATIONS_FOLDER, render_as_batch=True, include_name=include_in_migrations)
     with app.app_context():
-        db.create_all()
-        anonymous_user = User.query.filter_by(username='anonymous').first()
-        if not anonymous_user:
-            create_anonymous_user()
-            print("Anonymous user created.")
-        else:
-            print("Anonymous user already exists.")
-
-    @app.before_request
-    def enforce_foreign_keys():
-        if db.engine.dialect.name == "sqlite":
-            db.session.execute(text("PRAGMA foreign_keys=ON"))
+        init_instrumentation(app, db.engine)
+        init_chat_log(app, db.engine)
+        init_cleanup(app, db.engine)
+
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Migrate the database schema to the latest version and seed the anonymous user."""
+        bootstrap_database()
+
+    @app.cli.command('cleanup')
+    def cleanup_command():
+        """Purge deleted groups and delete the queued photo files from S3 now."""
+        groups, photos = cleanup.run_once()
+        print(f'{groups} deleted groups purged, {photos} photo files deleted.')
 
     return app
 
+def bootstrap_database():
+    """
+    One-off setup, kept out of app startup so serving (and importing the
+    app) never touches the schema: `flask --app app bootstrap`.
+    """
+    inspector = inspect(db.engine)
+    if inspector.has_table('user') and not inspector.has_table('alembic_version'):
+        # Created by db.create_all() before migrations existed
+        stamp(directory=MIGRATIONS_FOLDER, revision='0001_baseline')
+    upgrade(directory=MIGRATIONS_FOLDER)
+    anonymous_user = User.query.filter_by(username='anonymous').first()
+    if not anonymous_user:
+        create_anonymous_user()
+        print("Anonymous user created.")
+    else:
+        print("Anonymous user already exists.")
+
 app = create_app()
 init_socketio(app)
+init_dispatcher(app)
+init_membership(app)
+init_feed_cache(app)
+init_passwords(app)
+init_presence(app)
+init_changes(app)
+blacklist.init_app(app)
 jwt = JWTManager(app)
 
 
@@ -71,10 +197,12 @@ app.register_blueprint(comment_bp)
 # app.register_blueprint(calculator_bp)
 app.register_blueprint(group_bp)
 app.register_blueprint(chat_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(monitoring_bp)
 
 @jwt.token_in_blocklist_loader
 def check_if_token_in_blocklist(jwt_header, jwt_payload):
-    return jwt_payload["jti"] in blacklist
+    return blacklist.is_revoked(jwt_payload["jti"])
 
 @jwt.revoked_token_loader
 def revoked_token_callback(jwt_header, jwt_payload):
@@ -107,5 +235,12 @@ def missing_token_callback(error):
         401,
     )
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return (
+        jsonify({"message": "The request is too large.", "error": "request_too_large"}),
+        413,
+    )
+
 if __name__ == '__main__':
     socketio.run(app, debug=True, host='0.0.0.0', port=5000, log_output=True)
\ No newline at end of file
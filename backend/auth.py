@@ -1,12 +1,34 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity, unset_jwt_cookies
-from flask_bcrypt import Bcrypt
+from sqlalchemy import update
 from models import User, db
 from blacklist import blacklist
 from constants import FRONTEND_SERVER
+from cache import TTLCache
+from passwords import hasher, PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
-bcrypt = Bcrypt()
+
+# Usernames never change, so event payloads can resolve them without a query
+usernames = TTLCache(maxsize=10000, ttl=3600)
+user_ids = TTLCache(maxsize=100, ttl=3600)
+
+def get_username(user_id):
+    username = usernames.get(user_id)
+    if username is None:
+        username = db.session.query(User.username).filter_by(id=user_id).scalar()
+        if username is not None:
+            usernames.set(user_id, username)
+    return username
+
+def get_user_id(username):
+    # For the fixed accounts, such as 'anonymous', looked up by name on hot paths
+    user_id = user_ids.get(username)
+    if user_id is None:
+        user_id = db.session.query(User.id).filter_by(username=username).scalar()
+        if user_id is not None:
+            user_ids.set(username, user_id)
+    return user_id
 
 @auth_bp.route("/register", methods=['POST'])
 def register():
@@ -14,8 +36,12 @@ def register():
     existing_user = User.query.filter((User.username == data['username']) | (User.email == data['email'])).first()
     if existing_user:
         return jsonify({'message': 'Username or email already exists'}), 400
-    
-    hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    db.session.rollback()
+
+    try:
+        hashed_password = hasher.hash(data['password'])
+    except PasswordHasherBusy as e:
+        return jsonify({'message': str(e)}), 503
     user = User(username=data['username'], email=data['email'], password=hashed_password)
     db.session.add(user)
     db.session.commit()
@@ -24,8 +50,26 @@ def register():
 @auth_bp.route("/login", methods=['POST'])
 def login():
     data = request.get_json()
-    user = User.query.filter_by(username=data['username']).first()
-    if user and bcrypt.check_password_hash(user.password, data['password']):
+    user = db.session.query(User.id, User.password).filter_by(username=data['username']).first()
+    # Give the connection back to the pool while bcrypt runs
+    db.session.rollback()
+    try:
+        valid = user is not None and hasher.check(user.password, data['password'])
+    except PasswordHasherBusy as e:
+        return jsonify({'message': str(e)}), 503
+    if valid and hasher.needs_rehash(user.password):
+        # Stored hashes follow BCRYPT_LOG_ROUNDS as their owners log in; when the
+        # hasher is busy the rehash waits for a later login
+        try:
+            new_hash = hasher.hash(data['password'])
+        except PasswordHasherBusy:
+            new_hash = None
+        if new_hash:
+            db.session.execute(update(User)
+                               .where(User.id == user.id, User.password == user.password)
+                               .values(password=new_hash))
+            db.session.commit()
+    if valid:
         access_token = create_access_token(identity=user.id)
         response = jsonify(access_token=access_token)
         response.headers.add("Access-Control-Allow-Origin", FRONTEND_SERVER)
@@ -36,8 +80,8 @@ def login():
 @auth_bp.route("/logout", methods=['POST'])
 @jwt_required()
 def logout():
-    jti = get_jwt()['jti']
-    blacklist.add(jti)
+    token = get_jwt()
+    blacklist.revoke(token['jti'], token['exp'])
     response = jsonify({"message": "Successfully logged out"})
     unset_jwt_cookies(response)
     return response, 200
@@ -70,7 +114,7 @@ def create_anonymous_user():
     anonymous_user = User(
         username='anonymous',
         email='anonymous@example.com',
-        password=bcrypt.generate_password_hash('anonymous_password').decode('utf-8')
+        password=hasher.hash('anonymous_password')
         )
     db.session.add(anonymous_user)
     db.session.commit()
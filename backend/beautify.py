@@ -0,0 +1,124 @@
+# beautify.py
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from cache import TTLCache
+
+PROMPT = "I am posting a photo on a social media platform. This is my caption: '{text}'. Fix grammatical and sytactical errors and beautify it and return within 300 characters. Also add couple of hashtags"
+
+class BeautifyBusy(Exception):
+    pass
+
+class BeautifyTimeout(Exception):
+    pass
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModel:
+    """
+    Offline stand-in for the Gemini model, selected with BEAUTIFY_MODEL = 'stub'.
+    """
+
+    def generate_content(self, prompt):
+        caption = prompt.split("'")[1] if "'" in prompt else prompt
+        return StubResponse(f"{caption.strip().capitalize()} #photo #share"[:300])
+
+def create_gemini_model():
+    import google.generativeai as genai
+    from constants import GOOGLE_API_KEY
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai.GenerativeModel('gemini-pro')
+
+MODEL_FACTORIES = {
+    'gemini': create_gemini_model,
+    'stub': StubModel,
+}
+
+class BeautifyService:
+    """
+    Caption beautification with a content-keyed result cache, single-flight
+    coalescing of identical in-flight requests and a bounded executor.
+
+    Requests wait at most `timeout` seconds; a call that times out keeps
+    running and still populates the cache for the next attempt.
+    """
+
+    def __init__(self, model_factory, cache_size=1024, cache_ttl=3600, max_concurrency=4, max_pending=32, timeout=10):
+        self._model_factory = model_factory
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache = TTLCache(cache_size, cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='beautify')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self.timeout = timeout
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._model_factory()
+            return self._model
+
+    @staticmethod
+    def cache_key(text):
+        return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+    def beautify(self, text):
+        """
+        Raises:
+            BeautifyBusy: If too many distinct requests are already pending.
+            BeautifyTimeout: If the model does not answer within the timeout.
+        """
+        key = self.cache_key(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    return cached
+                if not self._slots.acquire(blocking=False):
+                    raise BeautifyBusy('Too many beautification requests in progress')
+                future = Future()
+                self._in_flight[key] = future
+                self._executor.submit(self._run, key, text, future)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise BeautifyTimeout('Timed out waiting for the beautified content')
+
+    def _run(self, key, text, future):
+        try:
+            result = self.model.generate_content(PROMPT.format(text=text)).text
+            self._cache.set(key, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            self._slots.release()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_beautify_service(config):
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = BeautifyService(
+                MODEL_FACTORIES[config['BEAUTIFY_MODEL']],
+                cache_size=config['BEAUTIFY_CACHE_SIZE'],
+                cache_ttl=config['BEAUTIFY_CACHE_TTL'],
+                max_concurrency=config['BEAUTIFY_MAX_CONCURRENCY'],
+                timeout=config['BEAUTIFY_TIMEOUT'],
+            )
+        return _service
@@ -0,0 +1,7 @@
+# Benchmarks for the backend. Run from the backend folder, e.g.
+#   python -m benchmarks.startup
+#   python -m benchmarks.query_plans
+#   python -m benchmarks.datagen --database-uri sqlite:////tmp/bench.db --scale medium
+#   python -m benchmarks.endpoints --output results.json
+#   python -m benchmarks.serialization
+#   python -m benchmarks.logins
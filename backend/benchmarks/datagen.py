@@ -0,0 +1,213 @@
+# benchmarks/datagen.py
+"""
+Seed a database with a synthetic social graph: users, groups and their
+memberships, feeds, comments, likes and chat messages.
+
+    python -m benchmarks.datagen --database-uri sqlite:////tmp/bench.db --scale medium
+    python -m benchmarks.datagen --database-uri postgresql://... --scale large --users 200000
+
+Rows are generated deterministically from --seed and bulk inserted in
+batches, so the large presets (millions of rows) run in bounded memory.
+The database is migrated with `bootstrap_database()` first; point
+--database-uri at an empty, disposable database. Every generated user
+has the password PASSWORD.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = 'benchmark'
+
+PRESETS = {
+    'small': dict(users=200, groups=10, groups_per_user=3, feeds_per_group=200,
+                  comments_per_feed=3, likes_per_feed=5, messages_per_group=500),
+    'medium': dict(users=10000, groups=200, groups_per_user=4, feeds_per_group=1000,
+                   comments_per_feed=3, likes_per_feed=5, messages_per_group=2000),
+    'large': dict(users=100000, groups=2000, groups_per_user=5, feeds_per_group=1000,
+                  comments_per_feed=4, likes_per_feed=8, messages_per_group=5000),
+}
+
+class SocialGraphGenerator:
+    """
+    Generates and inserts the rows for one graph. Ids are assigned up front,
+    after the highest existing id of each table, so related rows can be
+    generated without reading anything back.
+    """
+
+    def __init__(self, db, models, users, groups, groups_per_user, feeds_per_group,
+                 comments_per_feed, likes_per_feed, messages_per_group, seed=1, batch_size=5000, days=90):
+        self.db = db
+        self.models = models
+        self.users = users
+        self.groups = groups
+        self.groups_per_user = min(groups_per_user, groups)
+        self.feeds_per_group = feeds_per_group
+        self.comments_per_feed = comments_per_feed
+        self.likes_per_feed = likes_per_feed
+        self.messages_per_group = messages_per_group
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.started_at = datetime.utcnow() - timedelta(days=days)
+        self.span_seconds = days * 24 * 3600
+        self.counts = {}
+
+    def next_id(self, model):
+        return (self.db.session.query(self.db.func.max(model.id)).scalar() or 0) + 1
+
+    def insert(self, table, rows):
+        """
+        Insert an iterable of row dicts in batches of `batch_size`.
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, batch)
+                batch = []
+        if batch:
+            self._flush(table, batch)
+
+    def _flush(self, table, batch):
+        self.db.session.execute(table.insert(), batch)
+        self.db.session.commit()
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+
+    def moment(self):
+        return self.started_at + timedelta(seconds=self.random.random() * self.span_seconds)
+
+    def generate(self):
+        import bcrypt
+        User, Group, Feed, Comment, Like, ChatMessage, user_group = self.models
+        password = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+        first_user = self.next_id(User)
+        user_ids = list(range(first_user, first_user + self.users))
+        self.insert(User.__table__, (
+            {'id': user_id, 'username': f'bench{user_id}', 'email': f'bench{user_id}@example.com',
+             'password': password, 'created_at': self.started_at}
+            for user_id in user_ids
+        ))
+
+        first_group = self.next_id(Group)
+        group_ids = list(range(first_group, first_group + self.groups))
+        creators = {group_id: self.random.choice(user_ids) for group_id in group_ids}
+        self.insert(Group.__table__, (
+            {'id': group_id, 'name': f'Benchmark group {group_id}', 'code': f'{group_id:06X}',
+             'description': 'Synthetic benchmark group', 'created_by': creators[group_id],
+             'created_at': self.started_at}
+            for group_id in group_ids
+        ))
+
+        members = {group_id: {creators[group_id]} for group_id in group_ids}
+        for user_id in user_ids:
+            for group_id in self.random.sample(group_ids, self.groups_per_user):
+                members[group_id].add(user_id)
+        members = {group_id: sorted(user_ids) for group_id, user_ids in members.items()}
+        self.insert(user_group, (
+            {'user_id': user_id, 'group_id': group_id}
+            for group_id, group_members in members.items() for user_id in group_members
+        ))
+
+        feed_id = self.next_id(Feed)
+        comment_id = self.next_id(Comment)
+        like_id = self.next_id(Like)
+        feeds, comments, likes = [], [], []
+        for group_id in group_ids:
+            group_members = members[group_id]
+            for _ in range(self.feeds_per_group):
+                created_at = self.moment()
+                likers = self.random.sample(group_members, min(len(group_members), self.random.randint(0, 2 * self.likes_per_feed)))
+                feeds.append({'id': feed_id, 'heading': f'Feed {feed_id}', 'content': f'Synthetic feed {feed_id} content',
+                              'picture': None, 'created_by': self.random.choice(group_members), 'group_id': group_id,
+                              'created_at': created_at, 'like_count': len(likers)})
+                for _ in range(self.random.randint(0, 2 * self.comments_per_feed)):
+                    comments.append({'id': comment_id, 'feed_id': feed_id, 'comment': f'Comment {comment_id}',
+                                     'user_id': self.random.choice(group_members),
+                                     'added_at': created_at + timedelta(minutes=self.random.randint(1, 600))})
+                    comment_id += 1
+                for user_id in likers:
+                    likes.append({'id': like_id, 'user_id': user_id, 'feed_id': feed_id, 'created_at': created_at})
+                    like_id += 1
+                feed_id += 1
+                if len(feeds) + len(comments) + len(likes) >= self.batch_size:
+                    self._flush_feeds(feeds, comments, likes)
+        self._flush_feeds(feeds, comments, likes)
+
+        message_id = self.next_id(ChatMessage)
+        def messages():
+            nonlocal message_id
+            for group_id in group_ids:
+                for _ in range(self.messages_per_group):
+                    yield {'id': message_id, 'user_id': self.random.choice(members[group_id]), 'group_id': group_id,
+                           'message': f'Message {message_id}', 'timestamp': self.moment()}
+                    message_id += 1
+        self.insert(ChatMessage.__table__, messages())
+
+        self.reset_sequences(User, Group, Feed, Comment, Like, ChatMessage)
+        return self.counts
+
+    def _flush_feeds(self, feeds, comments, likes):
+        # Feeds go first so the comments and likes referencing them can be inserted
+        _, _, Feed, Comment, Like, _, _ = self.models
+        for table, rows in ((Feed.__table__, feeds), (Comment.__table__, comments), (Like.__table__, likes)):
+            if rows:
+                self.insert(table, rows)
+                rows.clear()
+
+    def reset_sequences(self, *models):
+        # Explicit ids leave PostgreSQL's serial sequences behind
+        if self.db.engine.dialect.name != 'postgresql':
+            return
+        for model in models:
+            table = model.__table__.name
+            self.db.session.execute(self.db.text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+            ))
+        self.db.session.commit()
+
+def generate_graph(db, **options):
+    """
+    Returns:
+        dict: Number of rows inserted per table.
+    """
+    from models import ChatMessage, Comment, Feed, Group, Like, User, user_group
+    models = (User, Group, Feed, Comment, Like, ChatMessage, user_group)
+    return SocialGraphGenerator(db, models, **options).generate()
+
+def add_graph_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(PRESETS), default='small', help='preset graph size (default: small)')
+    for name in PRESETS['small']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help='override the preset')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=5000)
+
+def graph_options(args):
+    options = dict(PRESETS[args.scale])
+    options.update({name: getattr(args, name) for name in options if getattr(args, name) is not None})
+    options.update(seed=args.seed, batch_size=args.batch_size)
+    return options
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', required=True)
+    add_graph_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = args.database_uri
+    from app import app, bootstrap_database
+    from models import db
+
+    with app.app_context():
+        bootstrap_database()
+        started = time.perf_counter()
+        counts = generate_graph(db, **graph_options(args))
+    for table, count in counts.items():
+        print(f'{table:>14}: {count:,} rows')
+    print(f'{sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
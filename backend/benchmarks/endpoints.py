@@ -0,0 +1,267 @@
+# benchmarks/endpoints.py
+"""
+Drive the hot endpoints against a seeded database and report latency
+percentiles, throughput and SQL queries per request.
+
+    python -m benchmarks.endpoints --output results.json
+    python -m benchmarks.endpoints --database-uri postgresql://... --generate --scale medium
+    python -m benchmarks.endpoints --database-uri sqlite:////tmp/bench.db --server http://127.0.0.1:5000
+    python -m benchmarks.endpoints --compare before.json --output after.json
+
+Without --database-uri a temporary SQLite database is generated. Requests
+go through the Flask test client unless --server points at a running
+instance of the app using the same database and JWT secret; queries per
+request are only counted in-process. S3 and Gemini are always stubbed in
+the benchmark process (see benchmarks.stubs).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.datagen import add_graph_arguments, graph_options
+
+ENDPOINTS = ['getAllFeeds', 'toggleLike', 'addComment', 'groupMessages', 'userGroups']
+
+def build_request(endpoint, actor, rng):
+    """
+    Returns:
+        tuple: (method, path, json body) of one request for `endpoint`.
+    """
+    if endpoint == 'getAllFeeds':
+        return 'GET', f"/getAllFeeds?groupCode={actor['code']}&page={rng.randint(1, 3)}", None
+    if endpoint == 'toggleLike':
+        return 'POST', '/toggleLike', {'feed_id': rng.choice(actor['feed_ids'])}
+    if endpoint == 'addComment':
+        return 'POST', '/addComment', {'feed_id': rng.choice(actor['feed_ids']), 'comment': 'Benchmark comment'}
+    if endpoint == 'groupMessages':
+        return 'GET', f"/group/{actor['code']}/messages", None
+    if endpoint == 'userGroups':
+        return 'GET', '/user/groups', None
+    raise ValueError(f'Unknown endpoint {endpoint}')
+
+def load_actors(db, count, rng):
+    """
+    Pick up to `count` users that belong to a group with feeds.
+
+    Returns:
+        list: Dicts with the user id, one of their group codes and feed ids from that group.
+    """
+    from flask_jwt_extended import create_access_token
+    from models import Feed, Group, user_group
+
+    memberships = (db.session.query(user_group.c.user_id, Group.id, Group.code)
+                   .join(Group, Group.id == user_group.c.group_id)
+                   .filter(db.session.query(Feed.id).filter(Feed.group_id == Group.id).exists())
+                   .order_by(user_group.c.user_id, Group.id)
+                   .limit(count * 20)
+                   .all())
+    by_user = {}
+    for user_id, group_id, code in memberships:
+        by_user.setdefault(user_id, (group_id, code))
+    actors = []
+    for user_id in rng.sample(sorted(by_user), min(count, len(by_user))):
+        group_id, code = by_user[user_id]
+        feed_ids = [feed_id for feed_id, in db.session.query(Feed.id).filter(Feed.group_id == group_id)
+                    .order_by(Feed.created_at.desc()).limit(50)]
+        actors.append({'user_id': user_id, 'code': code, 'feed_ids': feed_ids,
+                       'token': create_access_token(identity=user_id)})
+    return actors
+
+def row_counts(db):
+    from models import ChatMessage, Comment, Feed, Group, Like, User, user_group
+    tables = [User.__table__, Group.__table__, user_group, Feed.__table__, Comment.__table__, Like.__table__, ChatMessage.__table__]
+    return {table.name: db.session.execute(db.select(db.func.count()).select_from(table)).scalar() for table in tables}
+
+class QueryCounter:
+    """
+    Counts the SQL statements issued by the current thread.
+    """
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+class TestClientTransport:
+    def __init__(self, app, counter):
+        self.app = app
+        self.counter = counter
+        self._local = threading.local()
+
+    def __call__(self, method, path, body, token):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        self.counter.reset()
+        response = client.open(path, method=method, json=body, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code, self.counter.count
+
+class ServerTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def __call__(self, method, path, body, token):
+        import requests
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(method, self.base_url + path, json=body, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code, None
+
+def run_endpoint(transport, endpoint, actors, requests, concurrency, warmup, seed):
+    rng = random.Random(f'{seed}-{endpoint}')
+    plan = []
+    for _ in range(warmup + requests):
+        actor = rng.choice(actors)
+        plan.append((build_request(endpoint, actor, rng), actor['token']))
+    for (method, path, body), token in plan[:warmup]:
+        transport(method, path, body, token)
+
+    pending = iter(plan[warmup:])
+    lock = threading.Lock()
+    latencies, queries, errors = [], [], []
+
+    def worker():
+        while True:
+            with lock:
+                item = next(pending, None)
+            if item is None:
+                return
+            (method, path, body), token = item
+            started = time.perf_counter()
+            status, query_count = transport(method, path, body, token)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if query_count is not None:
+                    queries.append(query_count)
+                if status >= 400:
+                    errors.append(status)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentiles[49] * 1000, 3),
+        'p95_ms': round(percentiles[94] * 1000, 3),
+        'p99_ms': round(percentiles[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'requests_per_second': round(len(latencies) / wall_seconds, 1),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline=None):
+    columns = ['p50_ms', 'p95_ms', 'p99_ms', 'requests_per_second', 'queries_per_request']
+    print(f"{'endpoint':<15}" + ''.join(f'{column:>22}' for column in columns) + f"{'errors':>8}")
+    for endpoint, result in results.items():
+        cells = []
+        for column in columns:
+            value = result[column]
+            before = (baseline or {}).get(endpoint, {}).get(column)
+            cell = '-' if value is None else f'{value:g}'
+            if value is not None and before:
+                cell += f' ({(value - before) / before:+.0%})'
+            cells.append(f'{cell:>22}')
+        print(f'{endpoint:<15}' + ''.join(cells) + f"{result['errors']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', help='seeded database (default: generate a temporary SQLite one)')
+    parser.add_argument('--generate', action='store_true', help='seed --database-uri with a synthetic graph first')
+    add_graph_arguments(parser)
+    parser.add_argument('--server', help='base URL of a running app; default is the in-process test client')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--actors', type=int, default=50, help='distinct users issuing requests')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='results JSON of an earlier run to compare against')
+    args = parser.parse_args()
+
+    generate = args.generate or not args.database_uri
+    database_uri = args.database_uri or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = database_uri
+
+    from app import app, bootstrap_database
+    from models import db
+    from benchmarks.datagen import generate_graph
+    from benchmarks.stubs import install_stubs
+
+    install_stubs(app)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if generate:
+            bootstrap_database()
+            generate_graph(db, **graph_options(args))
+        actors = load_actors(db, args.actors, rng)
+        counts = row_counts(db)
+        dialect = db.engine.dialect.name
+        transport = ServerTransport(args.server) if args.server else TestClientTransport(app, QueryCounter(db.engine))
+    if not actors:
+        raise SystemExit('No users with group feeds found; run with --generate')
+
+    results = {}
+    for endpoint in args.endpoints:
+        results[endpoint] = run_endpoint(transport, endpoint, actors, args.requests, args.concurrency, args.warmup, args.seed)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'database': dialect,
+            'transport': 'server' if args.server else 'test_client',
+            'concurrency': args.concurrency,
+            'requests_per_endpoint': args.requests,
+            'python': platform.python_version(),
+            'rows': counts,
+        },
+        'results': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
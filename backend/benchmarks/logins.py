@@ -0,0 +1,160 @@
+# benchmarks/logins.py
+"""
+Run a burst of concurrent logins against a live server while a Socket.IO
+client keeps measuring round trips, and report login throughput next to
+socket latency when idle and under the burst.
+
+    python -m benchmarks.logins
+    python -m benchmarks.logins --workers 0            # hash inline, as before the pool
+    python -m benchmarks.logins --green eventlet       # eventlet server, as deployed
+    python -m benchmarks.logins --stored-rounds 10 --rounds 12
+
+The app is served in-process on --port from a temporary SQLite database.
+--stored-rounds below --rounds makes every first login rehash its user.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--green', choices=['none', 'eventlet', 'gevent'], default='none', help='monkey patch and serve with this library')
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_LOG_ROUNDS of the server')
+    parser.add_argument('--stored-rounds', type=int, help='cost of the seeded hashes (default: --rounds)')
+    parser.add_argument('--workers', type=int, default=4, help='PASSWORD_HASH_WORKERS; 0 hashes inline')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=200, help='logins in the burst')
+    parser.add_argument('--concurrency', type=int, default=16, help='clients logging in at once')
+    parser.add_argument('--idle-seconds', type=float, default=2.0, help='socket baseline before the burst')
+    parser.add_argument('--probe-interval', type=float, default=0.02, help='seconds between socket round trips')
+    parser.add_argument('--port', type=int, default=5077)
+    return parser.parse_args()
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+def summarize(values):
+    if not values:
+        return '-'
+    return (f'p50 {percentile(values, 50) * 1000:.1f} ms, p95 {percentile(values, 95) * 1000:.1f} ms, '
+            f'max {max(values) * 1000:.1f} ms ({len(values)} samples)')
+
+class SocketProbe:
+    """
+    Sends a `join` with an acknowledgement every `interval` seconds and
+    records the round trip, tagging each sample with the current phase.
+    The group does not exist, so each join is refused after a cached lookup.
+    """
+
+    def __init__(self, url, token, interval):
+        import socketio
+        self.client = socketio.Client()
+        self.client.connect(url, auth={'token': token})
+        self.interval = interval
+        self.phase = 'idle'
+        self.samples = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.perf_counter()
+            self.client.call('join', {'groupCode': 'LOGINBENCH'}, timeout=30)
+            self.samples.setdefault(self.phase, []).append(time.perf_counter() - started)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.client.disconnect()
+
+def login_burst(url, usernames, password, logins, concurrency):
+    import requests
+    pending = iter(range(logins))
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(pending, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            response = session.post(f'{url}/login', json={'username': usernames[index % len(usernames)], 'password': password})
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+def main():
+    args = parse_args()
+    if args.green == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif args.green == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+    database_uri = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'logins.db')}"
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = database_uri
+    os.environ['FLASK_BCRYPT_LOG_ROUNDS'] = str(args.rounds)
+    os.environ['FLASK_PASSWORD_HASH_WORKERS'] = str(args.workers)
+
+    from flask_jwt_extended import create_access_token
+    from app import app, bootstrap_database
+    from models import User, db
+    from passwords import PasswordHasher
+    from socketio_module import socketio
+
+    password = 'benchmark'
+    stored = PasswordHasher(rounds=args.stored_rounds or args.rounds, max_workers=0).hash(password)
+    usernames = [f'login{i}' for i in range(args.users)]
+    with app.app_context():
+        bootstrap_database()
+        db.session.execute(User.__table__.insert(), [
+            {'username': username, 'email': f'{username}@example.com', 'password': stored} for username in usernames
+        ])
+        db.session.commit()
+        token = create_access_token(identity=db.session.query(User.id).filter_by(username=usernames[0]).scalar())
+
+    server = threading.Thread(target=socketio.run, args=(app,), daemon=True,
+                              kwargs={'port': args.port, 'log_output': False, 'allow_unsafe_werkzeug': True})
+    server.start()
+    url = f'http://127.0.0.1:{args.port}'
+    time.sleep(1)
+
+    probe = SocketProbe(url, token, args.probe_interval)
+    probe.start()
+    time.sleep(args.idle_seconds)
+    probe.phase = 'logins'
+    latencies, statuses, wall_seconds = login_burst(url, usernames, password, args.logins, args.concurrency)
+    probe.stop()
+
+    print(f"Socket.IO async mode: {socketio.server.async_mode}, bcrypt rounds {args.rounds} "
+          f"(stored {args.stored_rounds or args.rounds}), hash workers {args.workers or 'inline'}")
+    print(f'logins:          {len(latencies) / wall_seconds:.1f}/s, {summarize(latencies)}, statuses {statuses}')
+    print(f"socket idle:     {summarize(probe.samples.get('idle', []))}")
+    print(f"socket in burst: {summarize(probe.samples.get('logins', []))}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# benchmarks/query_plans.py
+"""
+Run the main read endpoints against a small seeded database, EXPLAIN every
+SELECT they issue and fail if any of them reads a whole table instead of
+using an index.
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --database-uri postgresql://...
+
+The default is a throwaway SQLite file. PostgreSQL is planned with
+enable_seqscan off, so a sequential scan there means no usable index.
+The database is migrated with `bootstrap_database()` first, so point
+--database-uri at an empty, disposable database. tests/test_query_plans.py
+runs the same check on SQLite as part of the test suite.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+?)(?:_\d+)?(?: |$)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on "?(\w+)"?')
+
+def seed(db, models):
+    User, Group, Feed, Comment, Like, ChatMessage = models
+    users = [User(username=f'plan{i}', email=f'plan{i}@example.com', password='x') for i in range(2)]
+    db.session.add_all(users)
+    db.session.flush()
+    group = Group(name='Query plans', code='PLANS1', description='', created_by=users[0].id)
+    db.session.add(group)
+    db.session.flush()
+    for user in users:
+        user.groups.append(group)
+    for i in range(15):
+        feed = Feed(heading=f'Feed {i}', content='content', created_by=users[i % 2].id, group_id=group.id)
+        db.session.add(feed)
+        db.session.flush()
+        db.session.add(Comment(feed_id=feed.id, comment='comment', user_id=users[0].id))
+        db.session.add(Like(feed_id=feed.id, user_id=users[1].id))
+        db.session.add(ChatMessage(group_id=group.id, user_id=users[i % 2].id, message=f'message {i}'))
+    db.session.commit()
+    return [(user.id, user.username) for user in users], group.code
+
+def request_endpoints(get, users, code):
+    get('GET /getAllFeeds (page)', f'/getAllFeeds?groupCode={code}')
+    first = get('GET /getAllFeeds (cursor)', f'/getAllFeeds?groupCode={code}&cursor=')
+    get('GET /getAllFeeds (next cursor)', f"/getAllFeeds?groupCode={code}&cursor={first['next_cursor']}")
+    get('GET /getLikes', f"/getLikes?feed_ids={','.join(str(feed['id']) for feed in first['feeds'])}")
+    get('GET /getUserData (own feeds)', f'/getUserData?username={users[0][1]}')
+    get('GET /getUserData (member feeds)', f'/getUserData?username={users[1][1]}&groupCode={code}&cursor=')
+    messages = get('GET /group/<code>/messages', f'/group/{code}/messages?limit=5')
+    get('GET /group/<code>/messages (before)', f"/group/{code}/messages?limit=5&before={messages['next_before']}")
+    get('GET /group/<code>/changes', f'/group/{code}/changes?since=0&limit=5')
+    page = get('GET /search', '/search?q=comment&limit=5')
+    get('GET /search (group, cursor)', f"/search?q=comment&groupCode={code}&limit=5&cursor={page['next_cursor']}")
+    get('GET /user/groups', '/user/groups')
+    get('GET /about/<code>', f'/about/{code}')
+
+def plan_table_names(db):
+    # The search index is created by its migration rather than from the models
+    return set(db.metadata.tables) | {'search_document'}
+
+def full_scans(connection, statement, parameters, table_names):
+    """
+    Returns:
+        list: Names of the tables the statement reads in full.
+    """
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        matches = [SQLITE_FULL_SCAN.match(row[-1]) for row in plan]
+    else:
+        plan = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+        matches = [POSTGRES_FULL_SCAN.search(row[0]) for row in plan]
+    return [match.group(1) for match in matches if match and match.group(1) in table_names]
+
+def record_statements(app, db, models):
+    """
+    Seed the database and call every endpoint of `request_endpoints`.
+
+    Returns:
+        list: (endpoint, statement, parameters) of every SELECT they ran.
+    """
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        users, code = seed(db, models)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=users[0][0])}'}
+        engine = db.engine
+
+    statements = []
+    recorded = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            recorded.append((statement, parameters))
+
+    client = app.test_client()
+    # Chat history pages would otherwise come from the in-memory buffer
+    from chat_log import chat_log
+    serve_reads, chat_log.serve_reads = chat_log.serve_reads, False
+
+    def get(endpoint, path):
+        recorded.clear()
+        response = client.get(path, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'{endpoint} returned {response.status_code}: {response.get_data(as_text=True)}')
+        statements.extend((endpoint, statement, parameters) for statement, parameters in recorded)
+        return response.get_json()
+
+    try:
+        request_endpoints(get, users, code)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+        chat_log.serve_reads = serve_reads
+    return statements
+
+def check_plans(engine, statements, table_names):
+    """
+    EXPLAIN each distinct statement.
+
+    Returns:
+        tuple: (number of statements checked, list of (endpoint, statement, scanned tables))
+    """
+    failures = []
+    with engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql('SET enable_seqscan = off')
+        seen = set()
+        for endpoint, statement, parameters in statements:
+            if (endpoint, statement) in seen:
+                continue
+            seen.add((endpoint, statement))
+            scanned = full_scans(connection, statement, parameters, table_names)
+            if scanned:
+                failures.append((endpoint, statement, sorted(set(scanned))))
+    return len(seen), failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', help='empty database to seed (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='query-plans-')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = args.database_uri or f"sqlite:///{os.path.join(workdir, 'plans.db')}"
+
+    from app import app, bootstrap_database
+    from models import ChatMessage, Comment, Feed, Group, Like, User, db
+
+    with app.app_context():
+        bootstrap_database()
+        engine = db.engine
+        table_names = plan_table_names(db)
+    try:
+        statements = record_statements(app, db, (User, Group, Feed, Comment, Like, ChatMessage))
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    checked, failures = check_plans(engine, statements, table_names)
+    for endpoint, statement, scanned in failures:
+        print(f"FULL SCAN of {', '.join(scanned)} in {endpoint}:\n    {' '.join(statement.split())}\n")
+    print(f'{checked} queries from {len(set(s[0] for s in statements))} endpoints checked, {len(failures)} full table scans')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
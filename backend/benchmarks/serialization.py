@@ -0,0 +1,92 @@
+# benchmarks/serialization.py
+"""
+Compare the serializers module against the previous hand-built payloads:
+encoding a feed page as an HTTP response, and encoding an update_feed
+Socket.IO packet.
+
+    python -m benchmarks.serialization --feeds 10 --comments 5
+
+The previous path built dicts holding datetime objects and let Flask's
+JSON provider encode them (jsonify), and Flask-SocketIO encoded every
+emitted payload again with flask.json. No database is needed; rows are
+synthetic.
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+def make_rows(feeds, comments):
+    from serializers import FeedRow
+    now = datetime.utcnow()
+    rows = [FeedRow(i, f'Heading {i}', 'Some content about the picture ' * 4, f'feed_photo_{i}_0123abcd.jpg',
+                    f'user{i % 7}', now - timedelta(minutes=i), i % 11) for i in range(feeds)]
+    comment_rows = {row.id: [(row.id * 100 + j, f'Comment {j} on feed {row.id}', f'user{j}', now - timedelta(seconds=j))
+                             for j in range(comments)] for row in rows}
+    return rows, comment_rows
+
+def previous_feed(row, comments):
+    return {
+        'id': row.id,
+        'heading': row.heading,
+        'content': row.content,
+        'picture': row.picture,
+        'created_by': row.username,
+        'created_at': row.created_at,
+        'likes': row.like_count,
+        'comments': [{'id': comment_id, 'comment': text, 'added_by': username, 'added_at': added_at}
+                     for comment_id, text, username, added_at in comments],
+    }
+
+def new_feed(row, comments):
+    from serializers import serialize_comment, serialize_feed
+    return serialize_feed(row, [serialize_comment(*comment) for comment in comments])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, default=10, help='feeds per page')
+    parser.add_argument('--comments', type=int, default=5, help='comments per feed')
+    parser.add_argument('--number', type=int, default=2000, help='iterations per measurement')
+    args = parser.parse_args()
+
+    from flask import Flask, json as flask_json, jsonify
+    from flask_socketio import SocketIO
+    from socketio.packet import Packet, EVENT
+    import serializers
+    from serializers import EncodedJSON, SocketIOJSON, json_response
+
+    app = Flask(__name__)
+    # Flask-SocketIO's wrapper around flask.json, used before SocketIOJSON
+    flask_socketio_json = SocketIO(app, json=flask_json).server_options['json']
+    rows, comment_rows = make_rows(args.feeds, args.comments)
+
+    def previous_page():
+        return jsonify({'message': 'Successfully retrieved Feeds', 'feeds': [previous_feed(row, comment_rows[row.id]) for row in rows]}).get_data()
+
+    def new_page():
+        return json_response({'message': 'Successfully retrieved Feeds', 'feeds': [new_feed(row, comment_rows[row.id]) for row in rows]}).get_data()
+
+    def previous_emit():
+        payload = dict(previous_feed(rows[0], comment_rows[rows[0].id]), created_at=rows[0].created_at.isoformat())
+        Packet.json = flask_socketio_json
+        return Packet(EVENT, data=['update_feed', payload]).encode()
+
+    def new_emit():
+        Packet.json = SocketIOJSON
+        return Packet(EVENT, data=['update_feed', EncodedJSON(new_feed(rows[0], comment_rows[rows[0].id]))]).encode()
+
+    measurements = [
+        (f'feed page ({args.feeds} feeds x {args.comments} comments)', previous_page, new_page),
+        ('update_feed packet', previous_emit, new_emit),
+    ]
+    print(f"JSON encoder: {'orjson' if serializers.orjson else 'json (standard library)'}")
+    print(f"{'payload':<40}{'previous µs':>14}{'serializers µs':>16}{'speedup':>10}")
+    with app.test_request_context():
+        for name, previous, new in measurements:
+            previous_us = min(timeit.repeat(previous, number=args.number, repeat=3)) / args.number * 1e6
+            new_us = min(timeit.repeat(new, number=args.number, repeat=3)) / args.number * 1e6
+            print(f'{name:<40}{previous_us:>14.1f}{new_us:>16.1f}{previous_us / new_us:>9.2f}x')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# benchmarks/startup.py
+"""
+Measure the cost of importing the app in a fresh interpreter and fail if
+it exceeds a budget, so heavy clients or network calls don't creep back
+into import time.
+
+    python -m benchmarks.startup --runs 5 --max-seconds 2.0
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('boto3', 'nltk', 'google.generativeai', 'PIL.Image') if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+def measure_import(env):
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    elapsed, _, heavy = output.partition(' ')
+    return float(elapsed), [name for name in heavy.split(',') if name]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=2.0, help='budget for the median import time')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Any attempt to reach the network during import should fail fast
+    env.setdefault('HTTPS_PROXY', 'http://127.0.0.1:9')
+    env.setdefault('HTTP_PROXY', 'http://127.0.0.1:9')
+
+    timings = []
+    heavy_modules = set()
+    for _ in range(args.runs):
+        elapsed, heavy = measure_import(env)
+        timings.append(elapsed)
+        heavy_modules.update(heavy)
+
+    median = statistics.median(timings)
+    print(f"import app: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s over {args.runs} runs")
+
+    failed = False
+    if heavy_modules:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(sorted(heavy_modules))}")
+        failed = True
+    if median > args.max_seconds:
+        print(f"FAIL: median import time exceeds the {args.max_seconds:.3f}s budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
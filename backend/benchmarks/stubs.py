@@ -0,0 +1,53 @@
+# benchmarks/stubs.py
+import io
+import threading
+from datetime import datetime, timezone
+
+class InMemoryS3:
+    """
+    Stands in for the boto3 S3 client, so benchmarks never touch AWS.
+    Implements only the calls the app makes.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        data = Body.read() if hasattr(Body, 'read') else Body
+        with self._lock:
+            self.objects[Key] = (data, datetime.now(timezone.utc))
+        return {'ETag': f'"{len(data):x}"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            entry = self.objects.get(Key)
+        if entry is None:
+            from botocore.exceptions import ClientError
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, 'GetObject')
+        data, last_modified = entry
+        return {'Body': io.BytesIO(data), 'ETag': f'"{len(data):x}"', 'LastModified': last_modified,
+                'ContentLength': len(data)}
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete):
+        with self._lock:
+            for entry in Delete['Objects']:
+                self.objects.pop(entry['Key'], None)
+        return {'Errors': []}
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?expires={ExpiresIn}"
+
+def install_stubs(app):
+    """
+    Replace S3 with InMemoryS3 and Gemini with the offline stub model.
+    """
+    import utils
+    with utils._s3_client_lock:
+        utils._s3_client = InMemoryS3()
+    app.config['BEAUTIFY_MODEL'] = 'stub'
@@ -1 +1,113 @@
-blacklist = set()
\ No newline at end of file
+# blacklist.py
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from models import RevokedToken, db
+
+class DatabaseRevocationBackend:
+    """
+    Shared revocation storage in the `revoked_token` table. Any object with
+    the same three methods (e.g. a Redis-backed one) can be used instead.
+    """
+
+    def add(self, jti, expires_at):
+        insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        db.session.execute(
+            insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['jti'])
+        )
+        db.session.commit()
+
+    def revoked_since(self, since):
+        """
+        Returns:
+            list: (jti, expires_at) of unexpired tokens revoked at or after `since`.
+        """
+        return (db.session.query(RevokedToken.jti, RevokedToken.expires_at)
+                .filter(RevokedToken.revoked_at >= since, RevokedToken.expires_at > datetime.utcnow())
+                .all())
+
+    def purge_expired(self):
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        db.session.commit()
+
+class RevocationStore:
+    """
+    JWT revocation list shared by every worker through `backend`.
+
+    Each process keeps the unexpired revoked jtis in a local TTL set, so
+    checking a token is a dict lookup. The set is topped up from the
+    backend at most once every `sync_interval` seconds, which bounds how
+    long a logout takes to reach the other workers. Entries only live until
+    the token's own expiry, after which JWT validation rejects it anyway.
+    Expired rows are purged from the backend by a background task every
+    `purge_interval` seconds, never on the request path.
+    """
+
+    # Re-read recent revocations to cover clock skew and late commits
+    SYNC_OVERLAP = timedelta(seconds=30)
+
+    def __init__(self, backend=None, sync_interval=1.0, purge_interval=300):
+        self.backend = backend or DatabaseRevocationBackend()
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self._revoked = {}
+        self._synced_until = None
+        self._next_sync = 0
+        self._lock = threading.Lock()
+        self._purging = False
+        self.app = None
+
+    def init_app(self, app):
+        self.app = app
+        self.sync_interval = app.config['REVOCATION_SYNC_INTERVAL']
+        self.purge_interval = app.config['REVOCATION_PURGE_INTERVAL']
+
+    def revoke(self, jti, exp):
+        expires_at = datetime.utcfromtimestamp(exp)
+        self.backend.add(jti, expires_at)
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def is_revoked(self, jti):
+        if jti in self._revoked:
+            return True
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._revoked
+
+    def sync(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+
+            started_at = datetime.utcnow()
+            since = self._synced_until - self.SYNC_OVERLAP if self._synced_until else datetime.min
+            for jti, expires_at in self.backend.revoked_since(since):
+                self._revoked[jti] = (expires_at - datetime(1970, 1, 1)).total_seconds()
+            self._synced_until = started_at
+
+            wall_clock = time.time()
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > wall_clock}
+
+            if not self._purging and self.app is not None:
+                self._purging = True
+                from socketio_module import socketio
+                socketio.start_background_task(self._purge_expired)
+
+    def _purge_expired(self):
+        from socketio_module import socketio
+        while True:
+            socketio.sleep(self.purge_interval)
+            try:
+                with self.app.app_context():
+                    self.backend.purge_expired()
+            except Exception as e:
+                print(f"Failed to purge expired revocations: {e}")
+
+blacklist = RevocationStore()
@@ -0,0 +1,117 @@
+# changes.py
+from datetime import datetime
+from sqlalchemy import delete, event, func, insert, update
+from models import Group, GroupChange, db
+from events import dispatcher
+from serializers import EncodedJSON, dumps
+
+# Entries kept per group; older ones are trimmed every TRIM_EVERY entries
+LOG_SIZE = 1000
+TRIM_EVERY = 100
+
+def init_changes(app):
+    global LOG_SIZE
+    LOG_SIZE = app.config['CHANGE_LOG_SIZE']
+
+def reserve_seqs(conn, group_id, count, bump_feed_version=False):
+    """
+    Take the next `count` sequence numbers of a group, bumping its feed
+    version in the same statement if asked. The row lock on the group is
+    held until the transaction ends, so a group's entries commit in
+    sequence order.
+
+    Returns:
+        int: The first reserved number, None if the group does not exist.
+    """
+    values = {'change_seq': Group.change_seq + count}
+    if bump_feed_version:
+        values['feed_version'] = Group.feed_version + 1
+    last = conn.execute(update(Group).where(Group.id == group_id)
+                        .values(**values).returning(Group.change_seq)).scalar()
+    return None if last is None else last - count + 1
+
+def write_changes(conn, group_id, first_seq, entries):
+    """
+    Args:
+        entries (list): (event, EncodedJSON) pairs, numbered from `first_seq`.
+    """
+    now = datetime.utcnow()
+    conn.execute(insert(GroupChange), [
+        {'group_id': group_id, 'seq': first_seq + i, 'event': name, 'payload': payload.text, 'created_at': now}
+        for i, (name, payload) in enumerate(entries)
+    ])
+    last_seq = first_seq + len(entries) - 1
+    if last_seq // TRIM_EVERY != (first_seq - 1) // TRIM_EVERY:
+        conn.execute(delete(GroupChange).where(GroupChange.group_id == group_id, GroupChange.seq <= last_seq - LOG_SIZE))
+
+def group_writes(group_id):
+    """
+    What the current transaction writes to a group's row when it commits:
+    the change-log entries to number and whether to bump the feed version.
+    """
+    groups = db.session.info.setdefault('group_writes', {})
+    return groups.setdefault(group_id, {'entries': [], 'bump_feed_version': False})
+
+def publish(group_id, room, name, payload, merge_key=None):
+    """
+    Log an event in the caller's transaction and emit it to the group's
+    room once that transaction commits. The payload gains the entry's
+    `seq`, which clients pass back to /group/<code>/changes after a
+    reconnect. Nothing is emitted if the transaction rolls back.
+    """
+    group_writes(group_id)['entries'].append((name, dict(payload), room, merge_key))
+
+@event.listens_for(db.session, 'before_commit')
+def write_group_changes(session):
+    # Entries are numbered just before COMMIT, with one UPDATE per group that also
+    # bumps its feed version, so the group row stays locked as briefly as possible.
+    # Groups are taken in id order, so transactions touching several cannot deadlock.
+    groups = session.info.pop('group_writes', None)
+    if not groups:
+        return
+    conn = session.connection()
+    for group_id in sorted(groups):
+        entries = groups[group_id]['entries']
+        first_seq = reserve_seqs(conn, group_id, len(entries), groups[group_id]['bump_feed_version'])
+        if first_seq is None or not entries:
+            continue
+        encoded = [(name, EncodedJSON(dict(payload, seq=first_seq + i)), room, merge_key)
+                   for i, (name, payload, room, merge_key) in enumerate(entries)]
+        write_changes(conn, group_id, first_seq, [(name, payload) for name, payload, _, _ in encoded])
+        session.info.setdefault('published', []).extend(encoded)
+
+@event.listens_for(db.session, 'after_commit')
+def emit_published(session):
+    for name, payload, room, merge_key in session.info.pop('published', ()):
+        dispatcher.enqueue(name, payload, room=room, merge_key=merge_key)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_published(session):
+    session.info.pop('group_writes', None)
+    session.info.pop('published', None)
+
+def current_seq(group_id):
+    return db.session.query(Group.change_seq).filter(Group.id == group_id).scalar()
+
+def changes_since(group_id, since, limit):
+    """
+    Returns:
+        EncodedJSON: The entries after `since`, or `resync: true` when some
+        of them have been trimmed (or `since` is ahead of the log).
+    """
+    seq = current_seq(group_id)
+    oldest = db.session.query(func.min(GroupChange.seq)).filter(GroupChange.group_id == group_id).scalar()
+    if since > seq or (since < seq and (oldest is None or oldest > since + 1)):
+        return EncodedJSON({'seq': seq, 'resync': True, 'changes': [], 'has_more': False})
+
+    rows = (db.session.query(GroupChange.seq, GroupChange.event, GroupChange.payload)
+            .filter(GroupChange.group_id == group_id, GroupChange.seq > since)
+            .order_by(GroupChange.seq)
+            .limit(limit + 1)
+            .all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Stored payloads are already JSON; they are spliced in, not decoded
+    entries = ','.join(f'{{"seq":{row.seq},"event":{dumps(row.event)},"data":{row.payload}}}' for row in rows)
+    last = rows[-1].seq if rows else since
+    return EncodedJSON.from_text(f'{{"seq":{last},"resync":false,"has_more":{dumps(has_more)},"changes":[{entries}]}}')
@@ -1,53 +1,155 @@
 # chat.py
-from flask import Blueprint, jsonify, request
+from concurrent.futures import TimeoutError
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, ChatMessage, User, Group
+from sqlalchemy import tuple_
+from models import db, ChatMessage, User
+from utils import encode_cursor, decode_cursor
+from events import dispatcher
+from serializers import EncodedJSON, dumps, json_response, serialize_message, timestamp
+from membership import lookup_membership, membership_error
+from auth import get_user_id, get_username
+from chat_log import chat_log, ChatLogFull, MessageDropped
 from socketio_module import socketio
 
 chat_bp = Blueprint('chat', __name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_MESSAGE_LENGTH = ChatMessage.__table__.c.message.type.length
+ACK_MODES = ('buffered', 'persisted')
+
 def emit_message(message, group_code):
-    socketio.emit('message', message, room=group_code)
+    # Sent right away, before the write-behind flush numbers the message in the
+    # change log, so unlike other group events it carries no `seq`; clients
+    # pick up missed messages by replaying the log from their last seq
+    dispatcher.enqueue('message', EncodedJSON(message), room=group_code)
 
 @chat_bp.route('/group/<groupCode>/messages', methods=['GET'])
 @jwt_required()
 def get_group_messages(groupCode):
-    group = Group.query.filter_by(code=groupCode).first()
-    if not group:
-        return jsonify({'error': 'Group not found'}), 404
+    group_id, is_member = lookup_membership(get_jwt_identity(), groupCode)
+    error = membership_error(group_id, is_member)
+    if error:
+        return error
     
-    messages = ChatMessage.query.filter_by(group_id=group.id).order_by(ChatMessage.timestamp.asc()).all()
-    return jsonify({'messages': [{'user': User.query.get(msg.user_id).username, 'text': msg.message, 'timestamp': msg.timestamp.isoformat()} for msg in messages]})
+    if request.args.get('format') == 'ndjson':
+        return stream_group_messages(group_id)
+
+    before = request.args.get('before')
+    after = request.args.get('after')
+    limit = min(max(request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    if before and after:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+
+    query = message_query(group_id)
+    position = tuple_(ChatMessage.timestamp, ChatMessage.id)
+    try:
+        after_position = decode_cursor(after) if after else None
+        before_position = decode_cursor(before) if before else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Recent pages come from the group's buffer, which also holds messages not yet written
+    rows = chat_log.page(group_id, before_position, after_position, limit, lambda size: latest_messages(group_id, size))
+    if rows is None:
+        if after:
+            rows = query.filter(position > after_position).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).limit(limit + 1).all()
+        else:
+            if before:
+                query = query.filter(position < before_position)
+            rows = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not after:
+        # Pages are always returned oldest first
+        rows.reverse()
+
+    messages = [serialize_message(row.id, row.username, row.message, row.timestamp) for row in rows]
+    oldest, newest = (rows[0], rows[-1]) if rows else (None, None)
+    older_exist = has_more if not after else bool(rows)
+    return json_response({
+        'messages': messages,
+        'has_more': has_more,
+        'next_before': encode_cursor(oldest.timestamp, oldest.id) if oldest and older_exist else None,
+        'next_after': encode_cursor(newest.timestamp, newest.id) if newest else after
+    })
+
+def message_query(group_id):
+    return (db.session.query(ChatMessage.id, ChatMessage.message, ChatMessage.timestamp, User.username)
+            .join(User, ChatMessage.user_id == User.id)
+            .filter(ChatMessage.group_id == group_id))
+
+def latest_messages(group_id, count):
+    return message_query(group_id).order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(count).all()
+
+def stream_group_messages(group_id):
+    """
+    Stream a group's full history as newline-delimited JSON, oldest first,
+    without materializing it in memory.
+    """
+    # The stream reads the database only, so write out anything still queued
+    chat_log.flush_due()
+    query = (message_query(group_id)
+             .order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc())
+             .execution_options(stream_results=True)
+             .yield_per(500))
+
+    def generate():
+        for row in query:
+            yield dumps(serialize_message(row.id, row.username, row.message, row.timestamp)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @chat_bp.route('/group/<groupCode>/messages', methods=['POST'])
 @jwt_required()
 def send_group_message(groupCode):
+    """
+    The message is emitted as soon as it is validated and written to the
+    database shortly after, batched with others. Clients that need the
+    write confirmed pass `"ack": "persisted"` (or CHAT_ACK_MODE makes it
+    the default), and are answered once the row is committed.
+    """
     try:
         data = request.json
         message_content = data.get('content','').strip()
-        group = Group.query.filter_by(code=groupCode).first()
-        if not group:
-            return jsonify({'error': 'Group not found'}), 404
+        ack = data.get('ack', current_app.config['CHAT_ACK_MODE'])
+        if ack not in ACK_MODES:
+            return jsonify({'status': f"ack must be one of {', '.join(ACK_MODES)}"}), 400
+        current_user_id = get_jwt_identity()
+        group_id, is_member = lookup_membership(current_user_id, groupCode)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
         if message_content.startswith('#anonymous'):
             message_content = message_content.lstrip('#anonymous')
-            user = User.query.filter_by(username='anonymous').first()
+            user_id = get_user_id('anonymous')
+            username = 'anonymous'
         else:
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-
-        message = ChatMessage(user_id=user.id, group_id=group.id, message=message_content)
-        db.session.add(message)
-        db.session.commit()
-        message = {
-        'user': user.username,
-        'text': message.message,
-        'timestamp': message.timestamp.isoformat(),
-        'groupCode': groupCode
-        }
-        
-        emit_message(message, groupCode)
-        
-        return jsonify({'status': 'Message sent'})
+            user_id = current_user_id
+            username = get_username(current_user_id)
+        if not message_content:
+            return jsonify({'status': 'Message is empty'}), 400
+        if len(message_content) > MAX_MESSAGE_LENGTH:
+            return jsonify({'status': f'Message is longer than {MAX_MESSAGE_LENGTH} characters'}), 400
+
+        try:
+            row, written = chat_log.append(group_id, groupCode, user_id, username, message_content,
+                                           socketio.start_background_task, wait=ack == 'persisted')
+        except ChatLogFull as e:
+            return jsonify({'status': str(e)}), 503
+        emit_message(serialize_message(row.id, username, row.message, row.timestamp, groupCode), groupCode)
+
+        if written is not None:
+            chat_log.flush_due()
+            try:
+                written.result(timeout=current_app.config['CHAT_ACK_TIMEOUT'])
+            except TimeoutError:
+                return jsonify({'status': 'Message sent, not yet saved', 'id': row.id, 'persisted': False}), 504
+            except MessageDropped as e:
+                return jsonify({'status': f'Message not saved: {e}', 'id': row.id, 'persisted': False}), 410
+        return jsonify({'status': 'Message sent', 'id': row.id, 'timestamp': timestamp(row.timestamp), 'persisted': written is not None})
     except Exception as e:
         print(e)
-        return jsonify({'status': f'Failed sending message with error:{e}'}), 500
\ No newline at end of file
+        return jsonify({'status': f'Failed sending message with error:{e}'}), 500
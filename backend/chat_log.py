@@ -0,0 +1,297 @@
+# chat_log.py
+import atexit
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future
+from datetime import datetime
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+class ChatLogFull(Exception):
+    pass
+
+class MessageDropped(Exception):
+    pass
+
+# Column order of `chat.message_query`, so buffered and stored rows serialize alike
+ChatRow = namedtuple('ChatRow', ['id', 'message', 'timestamp', 'username'])
+
+def position(row):
+    return (row.timestamp, row.id)
+
+class RoomBuffer:
+    """
+    The most recent messages of one group, oldest first. `complete` means
+    the group has no older messages than the ones held; until `loaded`,
+    the buffer only collects new messages while the history is read.
+    """
+    __slots__ = ('rows', 'complete', 'loaded')
+
+    def __init__(self, size):
+        self.rows = deque(maxlen=size)
+        self.complete = False
+        self.loaded = False
+
+    def append(self, row):
+        if len(self.rows) == self.rows.maxlen:
+            self.complete = False
+        self.rows.append(row)
+
+    def fill(self, rows, complete):
+        self.rows.clear()
+        self.rows.extend(rows)
+        self.complete = complete and len(rows) <= self.rows.maxlen
+        self.loaded = True
+
+    def page(self, before, after, limit):
+        """
+        The rows `chat.get_group_messages` would read from the database for
+        this page, or None when the buffer cannot answer it on its own.
+        """
+        rows = list(self.rows)
+        if after is not None:
+            # Nothing between the cursor and the first buffered row may be missing
+            if not self.complete and (not rows or position(rows[0]) > after):
+                return None
+            return [row for row in rows if position(row) > after][:limit + 1]
+        if before is not None:
+            rows = [row for row in rows if position(row) < before]
+        if len(rows) <= limit and not self.complete:
+            return None
+        return rows[::-1][:limit + 1]
+
+class IdAllocator:
+    """
+    Hands out chat_message ids ahead of the insert, so a message can be
+    emitted with its final id before it is written. PostgreSQL ids come
+    from the table's sequence in blocks; SQLite continues from max(id),
+    which assumes a single server process.
+    """
+
+    def __init__(self, block_size=100):
+        self.block_size = block_size
+        self._ids = deque()
+        self._next = None
+
+    def allocate(self, engine):
+        if engine.dialect.name == 'postgresql':
+            if not self._ids:
+                with engine.connect() as conn:
+                    self._ids.extend(conn.execute(text(
+                        "SELECT nextval(pg_get_serial_sequence('chat_message', 'id')) FROM generate_series(1, :n)"),
+                        {'n': self.block_size}).scalars())
+            return self._ids.popleft()
+        if self._next is None:
+            from models import ChatMessage
+            with engine.connect() as conn:
+                self._next = (conn.execute(select(ChatMessage.id).order_by(ChatMessage.id.desc()).limit(1)).scalar() or 0) + 1
+        allocated, self._next = self._next, self._next + 1
+        return allocated
+
+class ChatLog:
+    """
+    Write-behind store for chat messages.
+
+    `append` assigns the id and timestamp, adds the message to its group's
+    ring buffer and queues the row; a background task writes queued rows
+    every `flush_interval` seconds in one multi-row insert. Recent history
+    is served from the buffers, which are filled from the database the
+    first time a group is read. Rows still queued at exit are flushed.
+    Written messages also go into their group's change log (changes.py).
+
+    At most `max_pending` rows wait to be written; beyond that, new
+    messages are refused. After a failed write the next attempt waits
+    twice as long as the previous one, up to `max_retry_delay` seconds.
+    """
+
+    def __init__(self, buffer_size=200, max_groups=1000, flush_interval=0.2, max_pending=10000, max_retry_delay=30):
+        self.buffer_size = buffer_size
+        self.max_groups = max_groups
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retry_delay = max_retry_delay
+        self._failures = 0
+        self._retry_at = 0
+        self.serve_reads = True
+        self.engine = None
+        self._buffers = OrderedDict()
+        self._pending = []
+        self._writing = []
+        self._ids = IdAllocator()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._started = False
+
+    def append(self, group_id, group_code, user_id, username, message, start_background_task, wait=False):
+        """
+        Returns:
+            tuple: (ChatRow, Future resolved once the row is committed, or None unless `wait`)
+
+        Raises:
+            ChatLogFull: If `max_pending` rows are already waiting to be written.
+        """
+        future = Future() if wait else None
+        with self._lock:
+            if len(self._pending) + len(self._writing) >= self.max_pending:
+                raise ChatLogFull('Too many messages waiting to be saved, try again shortly')
+            # Allocated under the lock, so ids and timestamps increase together
+            row = ChatRow(self._ids.allocate(self.engine), message, datetime.utcnow(), username)
+            values = {'id': row.id, 'user_id': user_id, 'group_id': group_id, 'message': message, 'timestamp': row.timestamp}
+            self._pending.append((values, row, future, group_code))
+            room = self._buffers.get(group_id)
+            if room is not None:
+                room.append(row)
+            if not self._started:
+                self._started = True
+                start_background_task(self._run)
+        return row, future
+
+    def page(self, group_id, before, after, limit, load_recent):
+        """
+        Rows for a page of a group's history from its buffer. The first read
+        of a group fills the buffer with `load_recent(size)`.
+
+        Returns:
+            list: Rows in the order the database query would return them, or None.
+        """
+        if not self.serve_reads or not self.buffer_size:
+            return None
+        with self._lock:
+            room = self._buffers.get(group_id)
+            if room is not None:
+                self._buffers.move_to_end(group_id)
+                return room.page(before, after, limit) if room.loaded else None
+            room = self._buffers[group_id] = RoomBuffer(self.buffer_size)
+            while len(self._buffers) > self.max_groups:
+                self._buffers.popitem(last=False)
+            # Anything sent from now on lands in `room`; anything earlier is
+            # either unwritten here or committed before load_recent reads
+            unwritten = [row for values, row, _, _ in self._pending + self._writing if values['group_id'] == group_id]
+
+        try:
+            recent = [ChatRow(*row) for row in load_recent(self.buffer_size)]
+        except Exception:
+            with self._lock:
+                if self._buffers.get(group_id) is room:
+                    del self._buffers[group_id]
+            raise
+        with self._lock:
+            rows = {row.id: row for row in recent + unwritten + list(room.rows)}
+            room.fill(sorted(rows.values(), key=position), complete=len(recent) < self.buffer_size)
+            return room.page(before, after, limit)
+
+    def forget(self, group_id):
+        with self._lock:
+            self._buffers.pop(group_id, None)
+            dropped = [item for item in self._pending if item[0]['group_id'] == group_id]
+            self._pending = [item for item in self._pending if item[0]['group_id'] != group_id]
+        # Senders waiting for the write learn at once that it will not happen
+        for _, _, future, _ in dropped:
+            if future is not None:
+                future.set_exception(MessageDropped('The group was deleted'))
+
+    def flush_due(self):
+        """
+        Flush unless the last write failed and its retry delay has not passed.
+        """
+        if time.monotonic() >= self._retry_at:
+            self.flush()
+
+    def flush(self):
+        """
+        Write every queued row. Rows that violate a constraint (e.g. their
+        group was deleted meanwhile) are dropped; on any other error the
+        batch is queued again for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._writing = batch
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            finally:
+                with self._lock:
+                    self._writing = []
+
+    def _write(self, batch):
+        from models import ChatMessage
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(ChatMessage.__table__), [values for values, _, _, _ in batch])
+                log_messages(conn, batch)
+        except IntegrityError:
+            for item in batch:
+                self._write_row(item)
+            return
+        except Exception as e:
+            with self._lock:
+                self._pending[:0] = batch
+                self._failures += 1
+                delay = min(self.flush_interval * 2 ** self._failures, self.max_retry_delay)
+                self._retry_at = time.monotonic() + delay
+            print(f"Failed to write {len(batch)} chat messages, retrying in {delay:.1f}s: {e}")
+            return
+        if self._failures:
+            print(f"Wrote {len(batch)} chat messages after {self._failures} failed attempts")
+            self._failures = 0
+            self._retry_at = 0
+        for _, _, future, _ in batch:
+            if future is not None:
+                future.set_result(True)
+
+    def _write_row(self, item):
+        from models import ChatMessage
+        values, _, future, _ = item
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(ChatMessage.__table__), values)
+                log_messages(conn, [item])
+        except Exception as e:
+            print(f"Dropped chat message {values['id']} for group {values['group_id']}: {e}")
+            if future is not None:
+                future.set_exception(MessageDropped(str(e)))
+            return
+        if future is not None:
+            future.set_result(True)
+
+    def _run(self):
+        from socketio_module import socketio
+        while True:
+            socketio.sleep(self.flush_interval)
+            try:
+                self.flush_due()
+            except Exception as e:
+                print(f"Chat log flush failed: {e}")
+
+def log_messages(conn, batch):
+    """
+    Add written messages to their groups' change logs, in the same
+    transaction and in group id order.
+    """
+    from changes import reserve_seqs, write_changes
+    from serializers import EncodedJSON, serialize_message
+    by_group = {}
+    for values, row, _, group_code in batch:
+        by_group.setdefault(values['group_id'], []).append(
+            ('message', EncodedJSON(serialize_message(row.id, row.username, row.message, row.timestamp, group_code))))
+    for group_id in sorted(by_group):
+        entries = by_group[group_id]
+        first_seq = reserve_seqs(conn, group_id, len(entries))
+        if first_seq is not None:
+            write_changes(conn, group_id, first_seq, entries)
+
+chat_log = ChatLog()
+
+def init_chat_log(app, engine):
+    chat_log.engine = engine
+    chat_log.buffer_size = app.config['CHAT_BUFFER_SIZE']
+    chat_log.max_groups = app.config['CHAT_BUFFER_GROUPS']
+    chat_log.flush_interval = app.config['CHAT_FLUSH_INTERVAL']
+    chat_log.max_pending = app.config['CHAT_MAX_PENDING']
+    chat_log.max_retry_delay = app.config['CHAT_RETRY_MAX_DELAY']
+    # Buffers only see messages sent through this process
+    chat_log.serve_reads = not app.config['SOCKETIO_MESSAGE_QUEUE']
+    atexit.register(chat_log.flush)
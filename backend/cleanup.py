@@ -0,0 +1,173 @@
+# cleanup.py
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, delete, exists, insert, literal, select, update
+from models import ChatMessage, Feed, Group, PhotoDeletion, user_group
+from constants import AWS_BUCKET
+from images import photo_keys
+from utils import get_s3, delete_files_from_s3
+
+# Most keys a DeleteObjects request accepts
+S3_BATCH_SIZE = 1000
+
+def queue_feed_photos(*criteria):
+    """
+    Statement queueing the photos of the feeds matching `criteria` for
+    deletion; run it in the transaction that deletes the feeds.
+    """
+    return insert(PhotoDeletion).from_select(['filename', 'next_attempt_at'], select(
+        Feed.picture, literal(datetime.utcnow(), DateTime)
+    ).where(Feed.picture.isnot(None), *criteria))
+
+def queue_photo(filename):
+    return insert(PhotoDeletion).values(filename=filename, next_attempt_at=datetime.utcnow())
+
+class Cleanup:
+    """
+    Background deletion of what requests only mark for deletion.
+
+    Groups with `deleted_at` set are purged `chunk_size` feeds, then chat
+    messages, per transaction; comments, likes and the change log go with
+    them through ON DELETE CASCADE. Queued photo files are claimed for
+    `lease` seconds, removed from S3 with DeleteObjects requests and, if
+    that fails, retried after `retry_delay` seconds, doubling up to
+    `max_attempts` tries.
+
+    The background task runs while there is work and is started again by
+    `schedule`; anything left by a previous process is picked up with the
+    next deletion or `flask cleanup`.
+    """
+
+    def __init__(self, interval=5.0, chunk_size=1000, retry_delay=30, max_attempts=8, lease=600):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.engine = None
+        self._lock = threading.Lock()
+        self._started = False
+        self._requested = False
+
+    def schedule(self, start_background_task):
+        # Called after committing a deletion
+        with self._lock:
+            self._requested = True
+            if self._started:
+                return
+            self._started = True
+        start_background_task(self._run)
+
+    def _run(self):
+        from socketio_module import socketio
+        while True:
+            with self._lock:
+                self._requested = False
+            try:
+                self.run_once()
+                remaining = self.pending()
+            except Exception as e:
+                print(f"Cleanup failed: {e}")
+                remaining = True
+            with self._lock:
+                if not remaining and not self._requested:
+                    self._started = False
+                    return
+            socketio.sleep(self.interval)
+
+    def run_once(self):
+        """
+        Purge every deleted group and delete the photo files that are due.
+
+        Returns:
+            tuple: (groups purged, photo files deleted)
+        """
+        with self.engine.connect() as conn:
+            group_ids = conn.execute(select(Group.id).where(Group.deleted_at.isnot(None))).scalars().all()
+        for group_id in group_ids:
+            self.purge_group(group_id)
+
+        deleted = 0
+        while True:
+            files, claimed = self.delete_photos()
+            deleted += files
+            if claimed < self.chunk_size:
+                return len(group_ids), deleted
+
+    def pending(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(exists().where(PhotoDeletion.id.isnot(None)))).scalar()
+
+    def purge_group(self, group_id):
+        self._delete_in_chunks(Feed, Feed.group_id == group_id, queue_photos=True)
+        self._delete_in_chunks(ChatMessage, ChatMessage.group_id == group_id)
+        with self.engine.begin() as conn:
+            conn.execute(user_group.delete().where(user_group.c.group_id == group_id))
+            conn.execute(delete(Group).where(Group.id == group_id))
+
+    def _delete_in_chunks(self, model, criterion, queue_photos=False):
+        while True:
+            with self.engine.begin() as conn:
+                ids = conn.execute(select(model.id).where(criterion).limit(self.chunk_size)).scalars().all()
+                if not ids:
+                    return
+                if queue_photos:
+                    conn.execute(queue_feed_photos(Feed.id.in_(ids)))
+                conn.execute(delete(model).where(model.id.in_(ids)))
+
+    def delete_photos(self):
+        """
+        Delete the files of up to `chunk_size` due queue entries.
+
+        Returns:
+            tuple: (files deleted, entries claimed)
+        """
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            due = (select(PhotoDeletion.id)
+                   .where(PhotoDeletion.next_attempt_at <= now)
+                   .order_by(PhotoDeletion.next_attempt_at)
+                   .limit(self.chunk_size))
+            if conn.dialect.name == 'postgresql':
+                # Concurrent workers claim different entries
+                due = due.with_for_update(skip_locked=True)
+            claimed = conn.execute(update(PhotoDeletion)
+                                   .where(PhotoDeletion.id.in_(due.scalar_subquery()))
+                                   .values(attempts=PhotoDeletion.attempts + 1,
+                                           next_attempt_at=now + timedelta(seconds=self.lease))
+                                   .returning(PhotoDeletion.id, PhotoDeletion.filename, PhotoDeletion.attempts)).all()
+        if not claimed:
+            return 0, 0
+
+        owners = {key: row for row in claimed for key in photo_keys(row.filename)}
+        keys = list(owners)
+        failed = set()
+        for start in range(0, len(keys), S3_BATCH_SIZE):
+            failed.update(owners[key].id for key in delete_files_from_s3(get_s3(), AWS_BUCKET, keys[start:start + S3_BATCH_SIZE]))
+
+        retries = {}
+        finished = []
+        for row in claimed:
+            if row.id not in failed:
+                finished.append(row.id)
+            elif row.attempts >= self.max_attempts:
+                print(f"Giving up deleting the photo {row.filename} after {row.attempts} attempts")
+                finished.append(row.id)
+            else:
+                retries.setdefault(row.attempts, []).append(row.id)
+        with self.engine.begin() as conn:
+            if finished:
+                conn.execute(delete(PhotoDeletion).where(PhotoDeletion.id.in_(finished)))
+            for attempts, ids in retries.items():
+                retry_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+                conn.execute(update(PhotoDeletion).where(PhotoDeletion.id.in_(ids)).values(next_attempt_at=retry_at))
+        return len(keys) - sum(1 for key in keys if owners[key].id in failed), len(claimed)
+
+cleanup = Cleanup()
+
+def init_cleanup(app, engine):
+    cleanup.engine = engine
+    cleanup.interval = app.config['CLEANUP_INTERVAL']
+    cleanup.chunk_size = app.config['CLEANUP_CHUNK_SIZE']
+    cleanup.retry_delay = app.config['CLEANUP_RETRY_DELAY']
+    cleanup.max_attempts = app.config['CLEANUP_MAX_ATTEMPTS']
@@ -1,28 +1,30 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Comment, Feed, Group, db
-from socketio_module import socketio
+from models import Comment, db
+from serializers import serialize_comment
+from auth import get_username
+from membership import lookup_membership, lookup_feed_group, membership_error
+from feed_cache import bump_feed_version
+from changes import publish
 
 comment_bp = Blueprint('comment', __name__)
 
-def emit_new_comment(feed_id, comment, group_code):
-    socketio.emit('new_comment', {'feed_id': feed_id, 'comment': {
-            'id': comment.id,
-            'comment': comment.comment,
-            'added_by': comment.author.username,
-            'added_at': comment.added_at.isoformat()
-    }}, room=group_code)
-
-def emit_delete_comment(feed_id, comment_id, group_code):
-    socketio.emit('delete_comment', {'feed_id': feed_id, 'comment_id': comment_id}, room=group_code)
-
-def emit_update_comment(feed_id, comment, group_code):
-    socketio.emit('update_comment', {'feed_id': feed_id, 'comment': {
-            'id': comment.id,
-            'comment': comment.comment,
-            'added_by': comment.author.username,
-            'added_at': comment.added_at.isoformat()
-    }}, room=group_code)
+def comment_payload(feed_id, comment):
+    return {
+        'feed_id': feed_id,
+        'comment': serialize_comment(comment.id, comment.comment, get_username(comment.user_id), comment.added_at),
+    }
+
+# The emit_* helpers run before the commit; see changes.publish
+
+def emit_new_comment(feed_id, comment, group_id, group_code):
+    publish(group_id, group_code, 'new_comment', comment_payload(feed_id, comment))
+
+def emit_delete_comment(feed_id, comment_id, group_id, group_code):
+    publish(group_id, group_code, 'delete_comment', {'feed_id': feed_id, 'comment_id': comment_id})
+
+def emit_update_comment(feed_id, comment, group_id, group_code):
+    publish(group_id, group_code, 'update_comment', comment_payload(feed_id, comment), merge_key=comment.id)
 
 @comment_bp.route("/addComment", methods=["POST"])
 @jwt_required()
@@ -31,13 +33,19 @@ def addComment():
     feed_id = data['feed_id']
     comment = data['comment']
     user_id = get_jwt_identity() 
-    groupId = Feed.query.get(feed_id).group_id
-    groupCode = Group.query.get(groupId).code
+    group_id, groupCode = lookup_feed_group(feed_id)
+    if groupCode is None:
+        return jsonify({'message': 'Feed not found'}), 404
+    error = membership_error(*lookup_membership(user_id, groupCode))
+    if error:
+        return error
     try:
         new_comment = Comment(feed_id=feed_id, comment=comment, user_id=user_id)
         db.session.add(new_comment)
+        db.session.flush()
+        bump_feed_version(group_id)
+        emit_new_comment(feed_id, new_comment, group_id, groupCode)
         db.session.commit()
-        emit_new_comment(feed_id, new_comment, groupCode)
 
         return jsonify({'message': 'Comment added successfully', 'comment_id': new_comment.id}), 201
     except Exception as e:
@@ -61,11 +69,11 @@ def deleteComment():
             return jsonify({"message": "Unauthorized"}), 403
 
         feedId = comment.feed_id
-        groupId = Feed.query.get(feedId).group_id
-        groupCode = Group.query.get(groupId).code
+        group_id, groupCode = lookup_feed_group(feedId)
         db.session.delete(comment)
+        bump_feed_version(group_id)
+        emit_delete_comment(feedId, commentId, group_id, groupCode)
         db.session.commit()
-        emit_delete_comment(feedId, commentId, groupCode)
         return jsonify({"message": "Comment deleted successfully"}), 200
     except Exception as e:
         return jsonify({"message": f"Failed deleting Comment with {e}"}), 500
@@ -84,14 +92,15 @@ def updateComment():
         comment = Comment.query.get(comment_id)
         if not comment:
             return jsonify({"message": "Comment not found"}), 404
+        if comment.user_id != get_jwt_identity():
+            return jsonify({"message": "Unauthorized"}), 403
 
+        feedId = comment.feed_id
+        group_id, groupCode = lookup_feed_group(feedId)
         comment.comment = new_comment
+        bump_feed_version(group_id)
+        emit_update_comment(feedId, comment, group_id, groupCode)
         db.session.commit()
-
-        feedId = comment.feed_id
-        groupId = Feed.query.get(feedId).group_id
-        groupCode = Group.query.get(groupId).code
-        emit_update_comment(feedId, comment, groupCode)
         return jsonify({"message": "Comment updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
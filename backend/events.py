@@ -0,0 +1,56 @@
+# events.py
+import itertools
+import threading
+from collections import OrderedDict
+from socketio_module import socketio
+from instrumentation import timed
+
+class EventDispatcher:
+    """
+    Buffers Socket.IO events and emits them from a background task, so
+    REST handlers only pay for appending an already-serialized payload.
+
+    Events are flushed per room every `flush_interval` seconds. Events
+    enqueued with the same `merge_key` within one tick collapse into the
+    most recent one, e.g. a burst of `like_feed` events for a feed.
+    """
+
+    def __init__(self, socketio, flush_interval=0.05):
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def enqueue(self, event, payload, room, merge_key=None):
+        key = (event, merge_key) if merge_key is not None else next(self._sequence)
+        with self._lock:
+            room_events = self._pending.setdefault(room, OrderedDict())
+            # A merged event takes the position of the latest one
+            room_events.pop(key, None)
+            room_events[key] = (event, payload)
+            if not self._started:
+                self._started = True
+                self.socketio.start_background_task(self._run)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for room, room_events in pending.items():
+            for event, payload in room_events.values():
+                try:
+                    with timed('socketio'):
+                        self.socketio.emit(event, payload, room=room)
+                except Exception as e:
+                    print(f"Failed to emit {event} to {room}: {e}")
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            self.flush()
+
+dispatcher = EventDispatcher(socketio)
+
+def init_dispatcher(app):
+    dispatcher.flush_interval = app.config['SOCKETIO_FLUSH_INTERVAL']
@@ -1,119 +1,172 @@
-from flask import Blueprint, jsonify, request, current_app, send_file
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Feed, Comment, User, Group, Like, db
+from models import Feed, Comment, Group, User, Like, user_group, db
+from sqlalchemy import case, exists, func, select, tuple_, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 import os
-from io import BytesIO
 from werkzeug.utils import secure_filename
-import base64
+from serializers import feed_row, json_response, serialize_comment, serialize_feed
+from instrumentation import timed
+from auth import get_username
+from membership import lookup_membership, lookup_feed_group, membership_error, invalidate_feed
+from feed_cache import bump_feed_version, feed_page_response
+from changes import publish
+from constants import AWS_BUCKET
+from images import image_executor, new_photo_filename, photo_key, render_variants, serve_photo, spool_data_url, spool_upload, IMAGE_VARIANTS
+from beautify import get_beautify_service, BeautifyBusy, BeautifyTimeout
+from utils import get_s3, upload_file_to_s3, encode_cursor, decode_cursor
+from cleanup import cleanup, queue_feed_photos, queue_photo
 from socketio_module import socketio
-from constants import AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_BUCKET, AWS_FILE_FOLDER, AWS_REGION
-from utils import get_s3_client, upload_file_to_s3, get_file_from_s3, delete_file_from_s3, beautifyContent
 
 feed_bp = Blueprint('feed', __name__)
-s3_client = get_s3_client(AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION)
+
+MAX_LIKE_BATCH = 100
+
+# The emit_* helpers run before the commit; see changes.publish
 
 def emit_new_feed(feed, group_code):
-    socketio.emit('new_feed', {
-        'id': feed.id,
-        'heading': feed.heading,
-        'content': feed.content,
-        'picture': feed.picture,
-        'created_by': User.query.get(feed.created_by).username,
-        'created_at': feed.created_at.isoformat(),
-        'comments': feed.comments,
-        'groupCode': group_code
-    }, room=group_code)
+    payload = serialize_feed(feed_row(feed, get_username(feed.created_by)), [], group_code)
+    publish(feed.group_id, group_code, 'new_feed', payload)
 
-def emit_delete_feed(feed_id, group_code):
-    socketio.emit('delete_feed', {'feed_id': feed_id}, room=group_code)
+def emit_delete_feed(feed_id, group_id, group_code):
+    publish(group_id, group_code, 'delete_feed', {'feed_id': feed_id})
 
 def emit_update_feed(feed, group_code):
-    serialized_comments = [serialize_comment(comment) for comment in feed.comments]
-
-    socketio.emit('update_feed', {
-        'id': feed.id,
-        'heading': feed.heading,
-        'content': feed.content,
-        'picture': feed.picture,
-        'created_by': User.query.get(feed.created_by).username,
-        'created_at': feed.created_at.isoformat(),
-        'comments': serialized_comments,
-        'groupCode': group_code
-    }, room=group_code)
+    payload = serialize_feed(feed_row(feed, get_username(feed.created_by)), load_comments([feed.id])[feed.id], group_code)
+    publish(feed.group_id, group_code, 'update_feed', payload, merge_key=feed.id)
 
-def emit_like(feed_id, like_count, group_code):
-    socketio.emit('like_feed', {
+def emit_like(feed_id, like_count, group_id, group_code):
+    publish(group_id, group_code, 'like_feed', {
         'feed_id': feed_id,
         'like_count': like_count,
         'groupCode': group_code
-    }, room=group_code)
-
+    }, merge_key=feed_id)
+
+def emit_likes(likes, group_id, group_code):
+    # One event for a whole batch: `likes` lists {feed_id, like_count} per changed feed
+    publish(group_id, group_code, 'like_feed', {'likes': likes, 'groupCode': group_code})
+
+def process_feed_photo(app, feed_id, group_code, spool_path):
+    """
+    Runs on the image executor: re-encode a spooled upload into its
+    variants, upload them and point the feed at the new picture.
+    """
+    with app.app_context():
+        try:
+            filename = new_photo_filename(feed_id)
+            for variant, image_data in render_variants(spool_path).items():
+                if not upload_file_to_s3(get_s3(), image_data, AWS_BUCKET, photo_key(filename, variant)):
+                    raise RuntimeError(f'failed to upload the {variant} variant to S3')
+
+            feed = Feed.query.get(feed_id)
+            if not feed:
+                # The feed was deleted while its photo was being processed
+                db.session.execute(queue_photo(filename))
+                db.session.commit()
+                cleanup.schedule(socketio.start_background_task)
+                return
+
+            if feed.picture:
+                db.session.execute(queue_photo(feed.picture))
+            feed.picture = filename
+            bump_feed_version(feed.group_id)
+            emit_update_feed(feed, group_code)
+            db.session.commit()
+            cleanup.schedule(socketio.start_background_task)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to process the photo of feed {feed_id}: {e}")
+        finally:
+            os.remove(spool_path)
+
+def submit_feed_photo(feed_id, group_code, spool_path):
+    image_executor.submit(process_feed_photo, current_app._get_current_object(), feed_id, group_code, spool_path)
 
 @feed_bp.route('/addFeed', methods=['POST'])
 @jwt_required()
 def add_feed():
-    data = request.get_json()
+    # Photos come as a multipart file that is streamed to disk; JSON with a
+    # base64 data URL is still accepted from older clients (the body size is
+    # capped by MAX_CONTENT_LENGTH either way)
+    if request.files or request.form:
+        data = request.form
+        photo_base64 = None
+    else:
+        data = request.get_json()
+        photo_base64 = data.get('photo')
     heading = data.get('heading')
     content = data.get('content')
-    photo_base64 = data.get('photo')
     group_code = data.get('groupCode')
     user_id = get_jwt_identity()
 
     if not heading or not content:
         return jsonify({'message': 'Heading and content are required'}), 400
 
+    group_id, is_member = lookup_membership(user_id, group_code)
+    error = membership_error(group_id, is_member)
+    if error:
+        return error
+
+    spool_path = None
+    photo = request.files.get('photo')
     try:
-        group = Group.query.filter_by(code=group_code).first()
-        new_feed = Feed(heading=heading, content=content, created_by=user_id, group_id=group.id)
+        if photo:
+            spool_path = spool_upload(photo, current_app.config['UPLOAD_FOLDER'])
+        elif photo_base64:
+            spool_path = spool_data_url(photo_base64, current_app.config['UPLOAD_FOLDER'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
+    try:
+        new_feed = Feed(heading=heading, content=content, created_by=user_id, group_id=group_id)
         db.session.add(new_feed)
-        db.session.flush()  # Ensure the feed ID is generated before committing
-
-        if photo_base64:
-            # Remove the "data:image/jpeg;base64," part
-            photo_data = photo_base64.split(',')[1]
-            photo_binary = base64.b64decode(photo_data)
-            filename = f"feed_photo_{new_feed.id}.jpg"
-            s3_file_name = f"feed_photos/{filename}"
-            s3_url = upload_file_to_s3(s3_client, photo_binary, AWS_BUCKET, s3_file_name)
-            if s3_url:
-                new_feed.picture = filename  # Assuming `picture_url` is a field in Feed model
-            else:
-                return jsonify({'message': 'Failed to upload image to S3'}), 500
-
-        db.session.commit()
-
+        db.session.flush()
+        bump_feed_version(group_id)
         # Emit the new feed to all clients in the group
         emit_new_feed(new_feed, group_code)
+        db.session.commit()
+
+        # The picture is attached, and `update_feed` emitted, once it has been processed
+        if spool_path:
+            submit_feed_photo(new_feed.id, group_code, spool_path)
 
-        return jsonify({'message': 'Feed added successfully', 'feed_id': new_feed.id}), 201
+        return jsonify({'message': 'Feed added successfully', 'feed_id': new_feed.id, 'picture_pending': bool(spool_path)}), 201
     except Exception as e:
         db.session.rollback()
+        if spool_path:
+            os.remove(spool_path)
         return jsonify({'message': f'Failed to add the feed due to error : {e}'}), 500
 
 @feed_bp.route("/getAllFeeds", methods=["GET"])
 @jwt_required()
 def get_all_feeds():
     page = request.args.get('page', default=1, type=int)
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', default='false').lower() == 'true'
     group_code = request.args.get('groupCode')
     per_page = 10  # You can adjust this value as needed
 
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
     if not group_code:
         return jsonify({'message': 'Group code is required'}), 400
 
     try:
-        # Get the group by code
-        group = Group.query.filter_by(code=group_code).first()
-        if not group:
-            return jsonify({'message': 'Group not found'}), 404
-        
-        if user not in group.members:
-            return jsonify({'message': 'You are not a member of this group'}), 403
-
-        pagination = Feed.query.filter_by(group_id=group.id).join(User).order_by(Feed.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        return jsonify_feeds(pagination)
+        group_id, is_member = lookup_membership(user_id, group_code)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
+
+        # Passing `cursor` (empty for the first page) switches to keyset pagination
+        if cursor is not None:
+            return feed_page_response(group_id, ('cursor', cursor, per_page, include_total),
+                                      lambda: build_feed_cursor_page([Feed.group_id == group_id], cursor, per_page, include_total))
+
+        return feed_page_response(group_id, ('page', page, per_page), lambda: build_feed_page(
+            feed_page_query(Feed.group_id == group_id).paginate(page=page, per_page=per_page, error_out=False)))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'An error occurred: {str(e)}'}), 500
 
@@ -123,19 +176,20 @@ def delete_feed():
     data = request.get_json()
     FeedId = data["postId"]
     try:
-        feed = Feed.query.get(FeedId)
-        group_code = Group.query.get(feed.group_id).code
-        db.session.delete(feed)
+        group_id, group_code = lookup_feed_group(FeedId)
+        if group_id is None:
+            return jsonify({"message": "Feed not found"}), 404
+        # Comments and likes go with the feed through ON DELETE CASCADE; its photo
+        # files are deleted from S3 in the background
+        db.session.execute(queue_feed_photos(Feed.id == FeedId))
+        if not db.session.execute(delete(Feed).where(Feed.id == FeedId)).rowcount:
+            db.session.rollback()
+            return jsonify({"message": "Feed not found"}), 404
+        bump_feed_version(group_id)
+        emit_delete_feed(FeedId, group_id, group_code)
         db.session.commit()
-
-        filename = f"feed_photo_{feed.id}.jpg"
-        s3_file_name = f"feed_photos/{filename}"
-        response = delete_file_from_s3(s3_client, AWS_BUCKET, s3_file_name)
-        if not response:
-            print('Failed to delete file')
-
-        emit_delete_feed(FeedId, group_code)
-
+        invalidate_feed(FeedId)
+        cleanup.schedule(socketio.start_background_task)
         return jsonify({"message": "Feed deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -159,37 +213,40 @@ def update_feed(feedId):
     if not heading or not content:
         return jsonify({'error': 'Heading and content are required'}), 400
 
+    spool_path = None
+    photo = request.files.get('photo')
+    if photo:
+        try:
+            spool_path = spool_upload(photo, current_app.config['UPLOAD_FOLDER'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
     feed.heading = heading
     feed.content = content
-    if 'photo' in request.files:
-        photo = request.files['photo']
-        if photo:
-            photo_binary = photo.read()
-            filename = f"feed_photo_{feed.id}.jpg"
-            s3_file_name = f"feed_photos/{filename}"
-            # Below code is not required at the moment
-            # response = delete_file_from_s3(s3_client, AWS_BUCKET, s3_file_name)
-            # if not response:
-            #     print('Failed to delete file')
-            s3_url = upload_file_to_s3(s3_client, photo_binary, AWS_BUCKET, s3_file_name)
-            if s3_url:
-                feed.picture = filename  
-            else:
-                return jsonify({'message': 'Failed to upload image to S3'}), 500
-
+    bump_feed_version(feed.group_id)
+    # Emit the feed update to all clients in the group
+    _, group_code = lookup_feed_group(feed.id)
+    emit_update_feed(feed, group_code)
     db.session.commit()
 
-    # Emit the feed update to all clients in the group
-    emit_update_feed(feed, Group.query.get(feed.group_id).code)
+    # A new photo is swapped in, and `update_feed` emitted again, once it has been processed
+    if spool_path:
+        submit_feed_photo(feed.id, group_code, spool_path)
 
-    return jsonify({'message': 'Feed updated successfully'}), 200
+    return jsonify({'message': 'Feed updated successfully', 'picture_pending': bool(spool_path)}), 200
 
 @feed_bp.route('/uploads/<filename>', methods=["GET"])
 def uploaded_file(filename):
+    from botocore.exceptions import ClientError
+    variant = request.args.get('size', default='full')
+    if variant not in IMAGE_VARIANTS:
+        return jsonify({'message': f'Unknown picture size: {variant}'}), 400
     try:
-        s3_file_name = f"feed_photos/{filename}"
-        image_data =  get_file_from_s3(s3_client, AWS_BUCKET, s3_file_name)
-        return send_file(BytesIO(image_data), mimetype='image/jpeg', as_attachment=True, download_name=filename)
+        return serve_photo(get_s3(), AWS_BUCKET, secure_filename(filename), variant, current_app.config)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return jsonify({'message': 'Picture not found'}), 404
+        return jsonify({'message': f'Failed to fetch feed picture from s3: {e}'}), 500
     except Exception as e:
         return jsonify({'message': f'Failed to fetch feed picture from s3: {e}'}), 500
 
@@ -198,105 +255,388 @@ def uploaded_file(filename):
 def getUserData():
     username = request.args.get('username')
     group_code = request.args.get('groupCode')
+    page = request.args.get('page', default=1, type=int)
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', default='false').lower() == 'true'
     
     try:
         user = User.query.filter_by(username=username).first()
-        group = Group.query.filter_by(code=group_code).first() if group_code else None
         if not user:
             return jsonify({'message': 'User not found'}), 404
         current_user = get_jwt_identity()
-        page = 1
+        group_id, is_member = lookup_membership(current_user, group_code) if group_code else (None, False)
         per_page = 10  # Adjust per_page to your needs
         if current_user == user.id:
-            pagination = Feed.query.filter_by(created_by=user.id).paginate(page=page, per_page=per_page, error_out=False)
-        elif group:
-            pagination = Feed.query.filter_by(created_by=user.id, group_id=group.id).paginate(page=page, per_page=per_page, error_out=False)
+            # Feeds of deleted groups are gone as soon as the group is, not once it is purged
+            criteria = [Feed.created_by == user.id,
+                        exists().where(Group.id == Feed.group_id, Group.deleted_at.is_(None))]
+        elif group_id and is_member:
+            criteria = [Feed.created_by == user.id, Feed.group_id == group_id]
         else:
             return jsonify({'message': 'Unauthorized access'}), 403
-        
-        feeds_response = jsonify_feeds(pagination)
-        feeds_data = feeds_response.get_json()
+
+        if cursor is not None:
+            feeds_data = build_feed_cursor_page(criteria, cursor, per_page, include_total)
+        else:
+            pagination = feed_page_query(*criteria).paginate(page=page, per_page=per_page, error_out=False)
+            feeds_data = build_feed_page(pagination)
         
         user_data = {
             'id': user.id,
             'username': user.username,
             'email': user.email,
             'feeds': feeds_data['feeds'],
-            'total_feeds': feeds_data['total']
+            'next_cursor': feeds_data.get('next_cursor')
         }
-        return jsonify({
+        if 'total' in feeds_data:
+            user_data['total_feeds'] = feeds_data['total']
+        return json_response({
             'message': 'Successfully retrieved user data',
             'user': user_data
-        }), 200
+        })
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'Failed to fetch user data: {e}'}), 500
 
+def apply_like(user_id, feed_id, liked):
+    """
+    Like or unlike a feed and adjust its denormalized `like_count`.
+
+    The like row change is idempotent (the unique (user_id, feed_id)
+    constraint absorbs duplicate likes) and the counter moves by the number
+    of rows actually changed, so the likes table is never recounted. On
+    Postgres both happen in a single statement.
+
+    Returns:
+        tuple: (changed, like_count); like_count is None if the feed does not exist.
+    """
+    if liked:
+        insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        change = (insert(Like)
+                  .values(user_id=user_id, feed_id=feed_id, created_at=datetime.utcnow())
+                  .on_conflict_do_nothing(index_elements=['user_id', 'feed_id']))
+    else:
+        change = delete(Like).where(Like.user_id == user_id, Like.feed_id == feed_id)
+    sign = 1 if liked else -1
+
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            changed_rows = change.returning(Like.feed_id).cte('changed_rows')
+            changed = select(func.count()).select_from(changed_rows).scalar_subquery()
+            stmt = (update(Feed)
+                    .where(Feed.id == feed_id)
+                    .values(like_count=Feed.like_count + sign * changed)
+                    .returning(Feed.like_count, changed)
+                    .add_cte(changed_rows))
+            row = db.session.execute(stmt).first()
+            return (bool(row[1]), row[0]) if row else (False, None)
+
+        changed = db.session.execute(change).rowcount
+        like_count = db.session.execute(
+            update(Feed).where(Feed.id == feed_id).values(like_count=Feed.like_count + sign * changed).returning(Feed.like_count)
+        ).scalar()
+        return bool(changed), like_count
+    except IntegrityError:
+        # The feed does not exist (foreign key violation)
+        db.session.rollback()
+        return False, None
+
+def feed_access(user_id, feed_id):
+    """
+    Returns:
+        tuple: (group_code, error); error is a JSON response and status code, or None.
+    """
+    _, group_code = lookup_feed_group(feed_id)
+    if group_code is None:
+        return None, (jsonify({'success': False, 'message': 'Feed not found'}), 404)
+    return group_code, membership_error(*lookup_membership(user_id, group_code))
+
+def like_response(feed_id, group_code, liked, changed, like_count):
+    if like_count is None:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Feed not found'}), 404
+    if changed:
+        group_id = lookup_feed_group(feed_id)[0]
+        bump_feed_version(group_id)
+        emit_like(feed_id, like_count, group_id, group_code)
+    db.session.commit()
+    return jsonify({'success': True, 'liked': liked, 'likeCount': like_count})
+
+@feed_bp.route('/likeFeed', methods=['POST'])
+@jwt_required()
+def like_feed():
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    feed_id = data.get('feed_id')
+    group_code, error = feed_access(current_user, feed_id)
+    if error:
+        return error
+    changed, like_count = apply_like(current_user, feed_id, liked=True)
+    return like_response(feed_id, group_code, True, changed, like_count)
+
+@feed_bp.route('/unlikeFeed', methods=['POST'])
+@jwt_required()
+def unlike_feed():
+    current_user = get_jwt_identity()
+    data = request.get_json()
+    feed_id = data.get('feed_id')
+    group_code, error = feed_access(current_user, feed_id)
+    if error:
+        return error
+    changed, like_count = apply_like(current_user, feed_id, liked=False)
+    return like_response(feed_id, group_code, False, changed, like_count)
+
 @feed_bp.route('/toggleLike', methods=['POST'])
 @jwt_required()
 def toggle_like():
     current_user = get_jwt_identity()
     data = request.get_json()
     feed_id = data.get('feed_id')
-    group_code = data.get('group_code')
-    like = Like.query.filter_by(user_id=current_user, feed_id=feed_id).first()
-    
-    if like:
-        db.session.delete(like)
-    else:
-        new_like = Like(user_id=current_user, feed_id=feed_id)
-        db.session.add(new_like)
-    
-    db.session.commit()
-    
-    like_count = Like.query.filter_by(feed_id=feed_id).count()
-    emit_like(feed_id, like_count, group_code)
-    return jsonify({'success': True, 'likeCount': like_count})
+    group_code, error = feed_access(current_user, feed_id)
+    if error:
+        return error
+
+    # Unliking a feed that was never liked changes nothing, in which case it gets liked
+    liked = False
+    changed, like_count = apply_like(current_user, feed_id, liked=False)
+    if not changed and like_count is not None:
+        liked = True
+        changed, like_count = apply_like(current_user, feed_id, liked=True)
+    return like_response(feed_id, group_code, liked, changed, like_count)
+
+def apply_likes(user_id, changes):
+    """
+    `apply_like` for many feeds at once: one insert for the likes, one
+    delete for the unlikes and one update moving each counter by what
+    actually changed.
+
+    Args:
+        changes (dict): feed_id -> liked.
+
+    Returns:
+        dict: feed_id -> (group_id, like_count) of the feeds whose like changed.
+    """
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    deltas = {}
+    liked = [feed_id for feed_id, like in changes.items() if like]
+    unliked = [feed_id for feed_id, like in changes.items() if not like]
+    if liked:
+        now = datetime.utcnow()
+        inserted = db.session.execute(insert(Like)
+                                      .values([{'user_id': user_id, 'feed_id': feed_id, 'created_at': now} for feed_id in liked])
+                                      .on_conflict_do_nothing(index_elements=['user_id', 'feed_id'])
+                                      .returning(Like.feed_id)).scalars()
+        deltas.update((feed_id, 1) for feed_id in inserted)
+    if unliked:
+        deleted = db.session.execute(delete(Like)
+                                     .where(Like.user_id == user_id, Like.feed_id.in_(unliked))
+                                     .returning(Like.feed_id)).scalars()
+        deltas.update((feed_id, -1) for feed_id in deleted)
+    if not deltas:
+        return {}
+
+    rows = db.session.execute(update(Feed)
+                              .where(Feed.id.in_(deltas))
+                              .values(like_count=Feed.like_count + case(deltas, value=Feed.id))
+                              .returning(Feed.id, Feed.group_id, Feed.like_count)
+                              .execution_options(synchronize_session=False)).all()
+    return {row.id: (row.group_id, row.like_count) for row in rows}
+
+def parse_like_operations(operations):
+    """
+    Returns:
+        dict: feed_id -> liked, in order; the last operation on a feed wins.
+
+    Raises:
+        ValueError: If the operations are malformed or too many.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('likes must be a non-empty list of {feed_id, liked}')
+    changes = {}
+    try:
+        for operation in operations:
+            feed_id = int(operation['feed_id'])
+            changes.pop(feed_id, None)
+            changes[feed_id] = bool(operation['liked'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('likes must be a non-empty list of {feed_id, liked}')
+    if len(changes) > MAX_LIKE_BATCH:
+        raise ValueError(f'At most {MAX_LIKE_BATCH} feeds per request')
+    return changes
+
+def member_feeds(user_id, feed_ids):
+    # Feeds among `feed_ids` in the user's groups
+    return (db.session.query(Feed.id)
+            .join(user_group, (user_group.c.group_id == Feed.group_id) & (user_group.c.user_id == user_id))
+            .filter(Feed.id.in_(feed_ids)))
+
+@feed_bp.route('/getLikes', methods=['GET'])
+@jwt_required()
+def get_likes():
+    """
+    Like counts of the comma separated `feed_ids` and whether the viewer
+    liked each, in one query. Feeds that do not exist or are outside the
+    viewer's groups are listed under `missing`.
+    """
+    current_user = get_jwt_identity()
+    try:
+        feed_ids = list(dict.fromkeys(int(feed_id) for feed_id in request.args.get('feed_ids', '').split(',') if feed_id))
+    except ValueError:
+        return jsonify({'message': 'feed_ids must be a comma separated list of feed ids'}), 400
+    if len(feed_ids) > MAX_LIKE_BATCH:
+        return jsonify({'message': f'At most {MAX_LIKE_BATCH} feeds per request'}), 400
+
+    liked = exists().where(Like.feed_id == Feed.id, Like.user_id == current_user)
+    rows = member_feeds(current_user, feed_ids).add_columns(Feed.like_count, liked).all() if feed_ids else []
+    found = {row[0]: row for row in rows}
+    return jsonify({
+        'success': True,
+        'likes': [{'feed_id': feed_id, 'likeCount': found[feed_id][1], 'liked': bool(found[feed_id][2])}
+                  for feed_id in feed_ids if feed_id in found],
+        'missing': [feed_id for feed_id in feed_ids if feed_id not in found]
+    })
+
+@feed_bp.route('/updateLikes', methods=['POST'])
+@jwt_required()
+def update_likes():
+    """
+    Apply many likes and unlikes, `likes: [{feed_id, liked}]`, in one
+    transaction. Each group with changed feeds gets a single `like_feed`
+    event listing them. Feeds that do not exist or are outside the user's
+    groups are skipped and listed under `missing`.
+    """
+    current_user = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    try:
+        changes = parse_like_operations(data.get('likes'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        # Locked in id order, so concurrent batches over the same feeds cannot deadlock
+        rows = (member_feeds(current_user, list(changes))
+                .add_columns(Feed.like_count, Group.code)
+                .join(Group, Group.id == Feed.group_id)
+                .order_by(Feed.id)
+                .with_for_update(of=Feed)
+                .all())
+        feeds = {row[0]: (row[1], row[2]) for row in rows}
+        changed = apply_likes(current_user, {feed_id: liked for feed_id, liked in changes.items() if feed_id in feeds})
+
+        by_group = {}
+        for feed_id, (group_id, like_count) in changed.items():
+            feeds[feed_id] = (like_count, feeds[feed_id][1])
+            by_group.setdefault(group_id, []).append({'feed_id': feed_id, 'like_count': like_count})
+        for group_id in sorted(by_group):
+            likes = by_group[group_id]
+            bump_feed_version(group_id)
+            emit_likes(likes, group_id, feeds[likes[0]['feed_id']][1])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating likes: {str(e)}")
+        return jsonify({'success': False, 'message': 'Failed to update likes'}), 500
+
+    return jsonify({
+        'success': True,
+        'likes': [{'feed_id': feed_id, 'liked': liked, 'likeCount': feeds[feed_id][0]}
+                  for feed_id, liked in changes.items() if feed_id in feeds],
+        'missing': [feed_id for feed_id in changes if feed_id not in feeds]
+    })
 
 @feed_bp.route("/getBeautifiedContent", methods = ["GET"])
 @jwt_required()
 def getBeautifiedContent():
     content = request.args.get('content')
-    print(content)
+    if not content:
+        return jsonify({'message': 'Content is required'}), 400
     try:
-        beautifiedContent = beautifyContent(content)
+        with timed('gemini'):
+            beautifiedContent = get_beautify_service(current_app.config).beautify(content)
         return jsonify({'mesaage': 'successfully beautified the content', 'content': beautifiedContent}), 200
-    except:
+    except BeautifyBusy as e:
+        return jsonify({'message': str(e)}), 503
+    except BeautifyTimeout as e:
+        return jsonify({'message': str(e)}), 504
+    except Exception as e:
         return jsonify({'message': f'Failed to fetch beautified content: {e}'}), 500
 
-def jsonify_feeds(pagination):
-    all_feeds_list = []
-    for feed in pagination.items:
-        comments = Comment.query.filter_by(feed_id=feed.id).join(User).all()
-        comment_list = [{
-            'id': comment.id,
-            'comment': comment.comment,
-            'added_by': comment.author.username,
-            'added_at': comment.added_at
-        } for comment in comments]
-        
-        feed_data = {
-            'id': feed.id,
-            'heading': feed.heading,
-            'content': feed.content,
-            'picture': feed.picture,
-            'created_by': feed.creator.username,
-            'created_at': feed.created_at,
-            'likes': Like.query.filter_by(feed_id=feed.id).count(),
-            'comments': comment_list
-        }
-        all_feeds_list.append(feed_data)
-    return jsonify({
+def feed_page_query(*criteria):
+    """
+    Query for a page of feeds as `FeedRow`-shaped tuples, the author's
+    username included, so rendering a page never loads ORM objects.
+    """
+    return (db.session.query(Feed.id, Feed.heading, Feed.content, Feed.picture, User.username, Feed.created_at, Feed.like_count)
+            .join(User, Feed.created_by == User.id)
+            .filter(*criteria)
+            .order_by(Feed.created_at.desc(), Feed.id.desc()))
+
+def load_comments(feed_ids):
+    """
+    Fetch the comments of all the given feeds with their authors in one query.
+
+    Returns:
+        dict: feed id -> list of serialized comments, oldest first.
+    """
+    comments_by_feed = {feed_id: [] for feed_id in feed_ids}
+    if not feed_ids:
+        return comments_by_feed
+    rows = (db.session.query(Comment.id, Comment.feed_id, Comment.comment, User.username, Comment.added_at)
+            .join(User, Comment.user_id == User.id)
+            .filter(Comment.feed_id.in_(feed_ids))
+            .order_by(Comment.added_at, Comment.id))
+    for comment_id, feed_id, text, username, added_at in rows:
+        comments_by_feed[feed_id].append(serialize_comment(comment_id, text, username, added_at))
+    return comments_by_feed
+
+def build_feed_page(pagination):
+    """
+    Assemble a feed page from a paginated `feed_page_query`.
+
+    The page costs a fixed number of queries regardless of its size: the
+    feed rows (authors included), the pagination count and one query for
+    all of the page's comments.
+    """
+    return {
         'message': 'Successfully retrieved Feeds',
-        'feeds': all_feeds_list,
+        'feeds': serialize_feed_rows(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
-        'current_page': 1
-    })
-
-def serialize_comment(comment):
-    return {
-        'id': comment.id,
-        'comment': comment.comment,
-        'added_by': comment.author.username,
-        'added_at': comment.added_at.isoformat()
-    }
\ No newline at end of file
+        'current_page': pagination.page
+    }
+
+def build_feed_cursor_page(criteria, cursor, per_page, include_total=False):
+    """
+    Assemble a feed page using keyset pagination on (created_at, id).
+
+    Unlike `build_feed_page` this never runs an OFFSET scan, and the total
+    count is only computed when `include_total` is requested.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    query = feed_page_query(*criteria)
+    if cursor:
+        created_at, feed_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Feed.created_at, Feed.id) < (created_at, feed_id))
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_feed = rows[-1]
+        next_cursor = encode_cursor(last_feed.created_at, last_feed.id)
+
+    page = {
+        'message': 'Successfully retrieved Feeds',
+        'feeds': serialize_feed_rows(rows),
+        'next_cursor': next_cursor
+    }
+    if include_total:
+        page['total'] = db.session.query(func.count(Feed.id)).filter(*criteria).scalar()
+    return page
+
+def serialize_feed_rows(rows):
+    comments_by_feed = load_comments([row.id for row in rows])
+    return [serialize_feed(row, comments_by_feed[row.id]) for row in rows]
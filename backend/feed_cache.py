@@ -0,0 +1,54 @@
+# feed_cache.py
+from flask import Response, request
+from models import Group, db
+from cache import TTLCache
+from serializers import EncodedJSON
+from changes import group_writes
+
+# (group_id, feed_version, page key) -> EncodedJSON of a group feed page.
+# Pages are the same for every member, so nothing viewer-specific is in the key.
+feed_pages = TTLCache(maxsize=2000, ttl=300)
+
+def init_feed_cache(app):
+    feed_pages.maxsize = app.config['FEED_PAGE_CACHE_SIZE']
+    feed_pages.ttl = app.config['FEED_PAGE_CACHE_TTL']
+
+def bump_feed_version(group_id):
+    """
+    Invalidate every cached page of a group. The counter is bumped when the
+    caller's transaction commits, in the statement that numbers its change
+    log entries, so other workers see the new version exactly when they see
+    the change itself.
+    """
+    group_writes(group_id)['bump_feed_version'] = True
+    discard_feed_pages(group_id)
+
+def discard_feed_pages(group_id):
+    # Entries of older versions are unreachable anyway; this frees them early
+    feed_pages.discard_where(lambda key, value: key[0] == group_id)
+
+def feed_page_response(group_id, page_key, build_page):
+    """
+    Serve a group feed page, answering If-None-Match with 304 when the
+    client's copy is current and otherwise from the cache when possible.
+
+    Args:
+        page_key (tuple): Everything besides the group that selects the page.
+        build_page (callable): Builds the page payload on a cache miss.
+    """
+    version = db.session.query(Group.feed_version).filter(Group.id == group_id).scalar()
+    etag = f'feeds-{group_id}-{version}'
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        key = (group_id, version) + page_key
+        page = feed_pages.get(key)
+        if page is None:
+            page = EncodedJSON(build_page())
+            feed_pages.set(key, page)
+        response = page.response()
+    response.set_etag(etag, weak=True)
+    # Browsers keep the page but revalidate it on every use
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
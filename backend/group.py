@@ -1,27 +1,41 @@
 from flask import Blueprint, jsonify, request, current_app, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Group, User, db
+from sqlalchemy import func, select, update
+from datetime import datetime
+from models import ChatMessage, Feed, Group, User, user_group, db
 from utils import generate_random_code
-from socketio_module import socketio
+from events import dispatcher
+from serializers import EncodedJSON, json_response, serialize_group, timestamp
+from auth import get_username
+from membership import lookup_membership, membership_error, invalidate_membership, invalidate_group
+from feed_cache import discard_feed_pages
+from chat_log import chat_log
+from presence import presence
+from changes import changes_since, current_seq, publish
+from socketio_module import remove_from_room, socketio
+from cleanup import cleanup
 
 group_bp = Blueprint('group', __name__)
 
+DEFAULT_MEMBERS_PAGE_SIZE = 50
+MAX_MEMBERS_PAGE_SIZE = 200
+DEFAULT_CHANGES_PAGE_SIZE = 200
+MAX_CHANGES_PAGE_SIZE = 500
 
 def emit_delete_group(groupCode):
-    socketio.emit('delete_group', {'groupCode': groupCode}, room=groupCode)
+    dispatcher.enqueue('delete_group', EncodedJSON({'groupCode': groupCode}), room=groupCode)
 
-def emit_leave_group(groupCode):
-    socketio.emit('leave_group', {'groupCode': groupCode}, room=groupCode)
+def emit_leave_group(groupCode, user_id):
+    # Only the sockets of the user who left; the rest of the room sees a presence change
+    payload = EncodedJSON({'groupCode': groupCode})
+    for sid in presence.sockets_of(user_id, groupCode):
+        dispatcher.enqueue('leave_group', payload, room=sid)
+    remove_from_room(user_id, groupCode)
 
 def emit_update_group(group, group_code):
-    print(f"Update Group emit {group_code}")
-    socketio.emit('update_group', {
-        'id': group.id,
-        'name': group.name,
-        'code': group.code,
-        'description': group.description,
-        'created_by': User.query.get(group.created_by).username,
-    }, room=group_code)
+    # Runs before the commit; see changes.publish
+    payload = serialize_group(group.id, group.name, group.code, group.description, get_username(group.created_by))
+    publish(group.id, group_code, 'update_group', payload, merge_key=group.id)
 
 @group_bp.route('/createGroup', methods=['POST'])
 @jwt_required()
@@ -44,6 +58,7 @@ def createGroup():
         user.groups.append(new_group)
 
         db.session.commit()
+        invalidate_group(code)
         return jsonify({'message': 'Group created successfully', 'newGroupCode': code}), 201
     except Exception as e:
         db.session.rollback()
@@ -60,33 +75,83 @@ def joinGroup():
     if not group_code:
         return jsonify({'message': 'groupCode is required'}), 400
 
-    group = Group.query.filter_by(code=group_code).first()
+    group = Group.query.filter_by(code=group_code, deleted_at=None).first()
 
     if group:
-        user = User.query.get(user_id)
-        if group not in user.groups:
-            user.groups.append(group)
+        _, is_member = lookup_membership(user_id, group_code)
+        if not is_member:
+            db.session.execute(user_group.insert().values(user_id=user_id, group_id=group.id))
             db.session.commit()
+            invalidate_membership(user_id, group_code)
             return jsonify({'message': 'Successfully joined the group', 'group': {'name': group.name, 'description': group.description}}), 200
         else:
             return jsonify({'message': 'You are already a member of this group', 'group': {'name': group.name, 'description': group.description}}), 200
     else:
         return jsonify({'message': 'Group not found'}), 404
 
+def group_dashboard_query(user_id):
+    """
+    One row per group the user belongs to, with the creator's username and
+    the sidebar counts computed by correlated subqueries on indexed columns.
+    """
+    members = user_group.alias('members')
+    member_count = select(func.count()).select_from(members).where(members.c.group_id == Group.id).scalar_subquery()
+    feed_count = select(func.count(Feed.id)).where(Feed.group_id == Group.id).scalar_subquery()
+    latest_feed_at = select(func.max(Feed.created_at)).where(Feed.group_id == Group.id).scalar_subquery()
+    latest_message_at = select(func.max(ChatMessage.timestamp)).where(ChatMessage.group_id == Group.id).scalar_subquery()
+    unread_feeds = (select(func.count(Feed.id))
+                    .where(Feed.group_id == Group.id, Feed.created_at > user_group.c.last_read_at, Feed.created_by != user_id)
+                    .scalar_subquery())
+    unread_messages = (select(func.count(ChatMessage.id))
+                       .where(ChatMessage.group_id == Group.id, ChatMessage.timestamp > user_group.c.last_read_at, ChatMessage.user_id != user_id)
+                       .scalar_subquery())
+    return (db.session.query(
+                Group.id, Group.name, Group.code, Group.description, User.username.label('created_by'),
+                member_count.label('member_count'), feed_count.label('feed_count'),
+                latest_feed_at.label('latest_feed_at'), latest_message_at.label('latest_message_at'),
+                unread_feeds.label('unread_feeds'), unread_messages.label('unread_messages'))
+            .join(user_group, user_group.c.group_id == Group.id)
+            .join(User, User.id == Group.created_by)
+            .filter(user_group.c.user_id == user_id))
+
+def serialize_group_summary(row):
+    activity = [moment for moment in (row.latest_feed_at, row.latest_message_at) if moment is not None]
+    summary = serialize_group(row.id, row.name, row.code, row.description, row.created_by)
+    summary.update({
+        'member_count': row.member_count,
+        'feed_count': row.feed_count,
+        'latest_activity_at': timestamp(max(activity)) if activity else None,
+        'unread_feeds': row.unread_feeds,
+        'unread_messages': row.unread_messages,
+        'unread_count': row.unread_feeds + row.unread_messages,
+    })
+    return summary
+
 @group_bp.route('/user/groups', methods=['GET'])
 @jwt_required()
 def get_user_groups():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        user_groups = user.groups.all()
-        groups = [{'id': group.id, 'name': group.name, 'code': group.code, 'description': group.description, 'created_by': User.query.get(group.created_by).username} for group in user_groups] 
-        return jsonify({"groups": groups}), 200
+        groups = [serialize_group_summary(row) for row in group_dashboard_query(get_jwt_identity())]
+        # Most recently active groups first
+        groups.sort(key=lambda group: group['latest_activity_at'] or '', reverse=True)
+        return json_response({"groups": groups})
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
 
+@group_bp.route('/group/<string:groupCode>/read', methods=['POST'])
+@jwt_required()
+def mark_group_read(groupCode):
+    user_id = get_jwt_identity()
+    group_id, is_member = lookup_membership(user_id, groupCode)
+    error = membership_error(group_id, is_member)
+    if error:
+        return error
+    db.session.execute(update(user_group)
+                       .where(user_group.c.user_id == user_id, user_group.c.group_id == group_id)
+                       .values(last_read_at=datetime.utcnow()))
+    db.session.commit()
+    return jsonify({'message': 'Group marked as read'}), 200
+
 @group_bp.route('/group/<string:groupCode>', methods = ["PUT"])
 @jwt_required()
 def update_group(groupCode):
@@ -94,9 +159,10 @@ def update_group(groupCode):
         return jsonify({'message': 'groupCode is required'}), 400
 
     try:
-        group = Group.query.filter_by(code=groupCode).first()
-        if not group:
-            return jsonify({'message': 'Group not found'}), 404
+        error = membership_error(*lookup_membership(get_jwt_identity(), groupCode))
+        if error:
+            return error
+        group = Group.query.filter_by(code=groupCode, deleted_at=None).first()
 
         data = request.get_json()
         newGroupName = data.get('groupName')
@@ -104,8 +170,8 @@ def update_group(groupCode):
             return jsonify({'error': 'New group name is missing'}), 400
 
         group.name = newGroupName
-        db.session.commit()
         emit_update_group(group, groupCode)
+        db.session.commit()
         return jsonify({'message': 'Group updated successfully'}), 200
     except Exception as e:
         return jsonify({'message': f'Group updation failed with {e}'}), 500
@@ -120,11 +186,14 @@ def leave_group():
     if not group_code:
             return jsonify({'error': 'Group code is missing'}), 400
     try:
-        user = User.query.get(user_id)
-        group = Group.query.filter_by(code=group_code).first()
-        user.groups.remove(group)
+        group_id, is_member = lookup_membership(user_id, group_code)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
+        db.session.execute(user_group.delete().where(user_group.c.user_id == user_id, user_group.c.group_id == group_id))
         db.session.commit()
-        emit_leave_group(group_code)
+        invalidate_membership(user_id, group_code)
+        emit_leave_group(group_code, user_id)
         return jsonify({"message": "User left the group successfully"}), 200
     except Exception as e:
         return jsonify({"message": f"Failed to remove user from the group with {e}"}), 500
@@ -136,33 +205,93 @@ def delete_group(group_code):
     if not group_code:
             return jsonify({'error': 'Group code is missing'}), 400
     try:
-        group = Group.query.filter_by(code=group_code).first()
-        db.session.delete(group)
+        group_id, is_member = lookup_membership(get_jwt_identity(), group_code)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
+        # The group disappears for everyone at once; its feeds, comments, messages and
+        # photos are deleted in the background in bounded chunks
+        db.session.execute(update(Group).where(Group.id == group_id).values(deleted_at=datetime.utcnow()))
+        db.session.execute(user_group.delete().where(user_group.c.group_id == group_id))
         db.session.commit()
+        invalidate_group(group_code)
+        discard_feed_pages(group_id)
+        chat_log.forget(group_id)
         emit_delete_group(group_code)
+        cleanup.schedule(socketio.start_background_task)
         return jsonify({"message": "Deleted the group successfully"}), 200
     except Exception as e:
         return jsonify({"message": f"Failed to delete the group with {e}"}), 500
 
+@group_bp.route('/group/<string:group_code>/changes', methods=['GET'])
+@jwt_required()
+def group_changes(group_code):
+    """
+    Events emitted to the group after `since`, for clients catching up
+    after a reconnect. Without `since`, only the current `seq` is returned,
+    to be read before loading the pages it applies to. `resync: true`
+    means the log no longer reaches back to `since` and pages must be
+    loaded again.
+    """
+    group_id, is_member = lookup_membership(get_jwt_identity(), group_code)
+    error = membership_error(group_id, is_member)
+    if error:
+        return error
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({'seq': current_seq(group_id), 'resync': False, 'has_more': False, 'changes': []}), 200
+    limit = min(max(request.args.get('limit', default=DEFAULT_CHANGES_PAGE_SIZE, type=int), 1), MAX_CHANGES_PAGE_SIZE)
+    return changes_since(group_id, since, limit).response()
+
+@group_bp.route('/group/<string:group_code>/presence', methods=['GET'])
+@jwt_required()
+def group_presence(group_code):
+    """
+    Members connected to this server with the group open, and who is typing.
+    """
+    error = membership_error(*lookup_membership(get_jwt_identity(), group_code))
+    if error:
+        return error
+    return jsonify(presence.online(group_code)), 200
+
 @group_bp.route('/about/<string:group_code>', methods=['GET'])
 @jwt_required()
 def about_group(group_code):
+    page = request.args.get('page', default=1, type=int)
+    per_page = min(max(request.args.get('per_page', default=DEFAULT_MEMBERS_PAGE_SIZE, type=int), 1), MAX_MEMBERS_PAGE_SIZE)
     try:
-        group = Group.query.filter_by(code=group_code).first()
-        if not group:
-            return jsonify({"error": "Group not found"}), 404
+        group_id, is_member = lookup_membership(get_jwt_identity(), group_code)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
+        row = (db.session.query(Group, User.username)
+               .join(User, User.id == Group.created_by)
+               .filter(Group.id == group_id, Group.deleted_at.is_(None))
+               .first())
+        if row is None:
+            # Deleted since the membership was cached
+            return membership_error(None, False)
+        group, created_by = row
 
-        members = [{"id": member.id, "username": member.username} for member in group.members]
+        members = (db.session.query(User.id, User.username)
+                   .join(user_group, user_group.c.user_id == User.id)
+                   .filter(user_group.c.group_id == group.id)
+                   .order_by(User.username)
+                   .paginate(page=page, per_page=per_page, error_out=False))
         
         group_info = {
             'id': group.id,
             'name': group.name,
             'code': group.code,
             'description': group.description,
-            'created_by': User.query.get(group.created_by).username,
+            'created_by': created_by,
             'created_at': group.created_at,
-            'members': members
+            'members': [{"id": member.id, "username": member.username} for member in members.items],
+            'member_count': members.total,
+            'members_page': members.page,
+            'members_pages': members.pages,
+            'has_more_members': members.has_next,
         }
         return jsonify({"group": group_info}), 200
     except Exception as e:
-        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
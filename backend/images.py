@@ -0,0 +1,273 @@
+# images.py
+import os
+import re
+import base64
+import uuid
+import hashlib
+import tempfile
+import threading
+from io import BytesIO
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import send_file, redirect
+from instrumentation import timed
+
+PHOTO_FOLDER = 'feed_photos'
+
+# Longest edge, in pixels, of each variant stored in S3. 'full' keeps the
+# legacy key layout (feed_photos/<filename>) so existing URLs keep working.
+IMAGE_VARIANTS = {
+    'full': 2048,
+    'medium': 1024,
+    'thumb': 320,
+}
+
+VERSIONED_FILENAME = re.compile(r'^feed_photo_\d+_[0-9a-f]{8}\.jpg$')
+
+# Versioned photo keys are never overwritten, so clients may cache them forever
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LEGACY_MAX_AGE = 3600
+
+JPEG_QUALITY = 85
+SPOOL_CHUNK_SIZE = 1 << 16  # multiple of 4, so every chunk is valid base64
+
+# Re-encoding is CPU bound; keep it off the request threads and bounded
+image_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-ingest')
+
+def new_photo_filename(feed_id):
+    """
+    Every upload gets a fresh filename, so a stored object is never overwritten.
+    """
+    return f"feed_photo_{feed_id}_{uuid.uuid4().hex[:8]}.jpg"
+
+def is_versioned(filename):
+    return bool(VERSIONED_FILENAME.match(filename))
+
+def photo_key(filename, variant='full'):
+    # Pictures uploaded before variants existed only have the full size
+    if variant == 'full' or not is_versioned(filename):
+        return f"{PHOTO_FOLDER}/{filename}"
+    return f"{PHOTO_FOLDER}/{variant}/{filename}"
+
+def photo_keys(filename):
+    return [photo_key(filename, variant) for variant in IMAGE_VARIANTS]
+
+def _check_image(path):
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception:
+        os.remove(path)
+        raise ValueError('Uploaded photo is not a valid image')
+
+def spool_data_url(data_url, folder):
+    """
+    Decode a base64 data URL to a temporary file chunk by chunk, without
+    holding a second decoded copy of the image in memory.
+
+    Returns:
+        str: Path of the spooled file.
+
+    Raises:
+        ValueError: If the payload is not a valid image.
+    """
+    # Remove the "data:image/jpeg;base64," part
+    payload = data_url.split(',', 1)[1] if ',' in data_url else data_url
+    os.makedirs(folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.upload', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            for start in range(0, len(payload), SPOOL_CHUNK_SIZE):
+                spool.write(base64.b64decode(payload[start:start + SPOOL_CHUNK_SIZE]))
+    except Exception:
+        os.remove(path)
+        raise ValueError('Uploaded photo is not valid base64')
+    _check_image(path)
+    return path
+
+def spool_upload(file_storage, folder):
+    """
+    Stream a multipart upload to a temporary file.
+
+    Returns:
+        str: Path of the spooled file.
+
+    Raises:
+        ValueError: If the upload is not a valid image.
+    """
+    os.makedirs(folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.upload', dir=folder)
+    os.close(fd)
+    file_storage.save(path)
+    _check_image(path)
+    return path
+
+def render_variants(path):
+    """
+    Re-encode a spooled image as bounded JPEG variants.
+
+    JPEGs are decoded at a reduced scale where possible (`Image.draft`), so
+    memory use is bounded by the largest variant rather than the upload.
+
+    Returns:
+        dict: variant name -> JPEG bytes
+    """
+    from PIL import Image, ImageOps
+    largest = max(IMAGE_VARIANTS.values())
+    rendered = {}
+    with Image.open(path) as source:
+        source.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(source).convert('RGB')
+    # Shrink progressively from the largest variant to the smallest
+    for variant, size in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        img.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        rendered[variant] = buffer.getvalue()
+    return rendered
+
+
+CachedPhoto = namedtuple('CachedPhoto', ['path', 'size', 'etag', 'last_modified'])
+
+class PhotoCache:
+    """
+    Size-capped, least-recently-used cache of S3 photos on local disk.
+
+    Entries are stored as `<sha1 of key>-<S3 ETag>` with the file's mtime
+    set to the object's Last-Modified, so the index can be rebuilt from the
+    folder after a restart.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        os.makedirs(self.folder, exist_ok=True)
+        cached_files = []
+        for name in os.listdir(self.folder):
+            digest, _, etag = name.partition('-')
+            if len(digest) != 40 or not etag:
+                continue
+            stat = os.stat(os.path.join(self.folder, name))
+            cached_files.append((stat.st_atime, digest, CachedPhoto(os.path.join(self.folder, name), stat.st_size, etag, stat.st_mtime)))
+        for _, digest, entry in sorted(cached_files, key=lambda item: item[0]):
+            self._entries[digest] = entry
+            self._size += entry.size
+        self._loaded = True
+
+    def get(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if not os.path.exists(entry.path):
+                # Evicted by another process sharing the folder
+                del self._entries[digest]
+                self._size -= entry.size
+                return None
+            self._entries.move_to_end(digest)
+            return entry
+
+    def fetch(self, s3, bucket_name, key):
+        """
+        Stream an object from S3 into the cache.
+
+        Returns:
+            CachedPhoto: The new entry.
+        """
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=self.folder)
+        try:
+            with timed('s3'), os.fdopen(fd, 'wb') as cached_file:
+                response = s3.get_object(Bucket=bucket_name, Key=key)
+                body = response['Body']
+                for chunk in iter(lambda: body.read(SPOOL_CHUNK_SIZE), b''):
+                    cached_file.write(chunk)
+            etag = response.get('ETag', '').strip('"') or uuid.uuid4().hex
+            path = os.path.join(self.folder, f"{digest}-{etag}")
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        last_modified = response.get('LastModified')
+        if last_modified is not None:
+            timestamp = last_modified.timestamp()
+            os.utime(path, (timestamp, timestamp))
+        stat = os.stat(path)
+        entry = CachedPhoto(path, stat.st_size, etag, stat.st_mtime)
+
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._size -= previous.size
+                if previous.path != path:
+                    self._remove(previous.path)
+            self._entries[digest] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self._remove(evicted.path)
+        return entry
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+_photo_cache = None
+_photo_cache_lock = threading.Lock()
+
+def get_photo_cache(config):
+    global _photo_cache
+    with _photo_cache_lock:
+        if _photo_cache is None:
+            _photo_cache = PhotoCache(config['PHOTO_CACHE_FOLDER'], config['PHOTO_CACHE_MAX_BYTES'])
+        return _photo_cache
+
+def serve_photo(s3, bucket_name, filename, variant, config):
+    """
+    Serve a stored photo, either redirecting to a presigned S3 URL or from
+    the local disk cache with ETag/Last-Modified validation and Range support.
+
+    Raises:
+        botocore.exceptions.ClientError: If the object cannot be fetched.
+    """
+    key = photo_key(filename, variant)
+    max_age = IMMUTABLE_MAX_AGE if is_versioned(filename) else LEGACY_MAX_AGE
+
+    if config['PHOTO_SERVE_MODE'] == 'redirect':
+        expires_in = config['PHOTO_URL_EXPIRES']
+        url = s3.generate_presigned_url('get_object', Params={'Bucket': bucket_name, 'Key': key}, ExpiresIn=expires_in)
+        response = redirect(url, 302)
+        # Let browsers reuse the redirect for a while, but not past the URL's expiry
+        response.cache_control.private = True
+        response.cache_control.max_age = min(max_age, expires_in // 2)
+        return response
+
+    cache = get_photo_cache(config)
+    entry = cache.get(key) or cache.fetch(s3, bucket_name, key)
+    response = send_file(
+        entry.path,
+        mimetype='image/jpeg',
+        download_name=filename,
+        conditional=True,
+        etag=entry.etag,
+        last_modified=entry.last_modified,
+        max_age=max_age,
+    )
+    if is_versioned(filename):
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,173 @@
+# instrumentation.py
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram, keyed by a tuple of label values.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            label_text = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = f'{label_text},' if label_text else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter', f'{self.name} {self.value}']
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+request_seconds = Histogram('http_request_duration_seconds', 'Total time spent handling a request.', ('route', 'method'))
+request_db_seconds = Histogram('http_request_db_seconds', 'Time a request spent executing SQL.', ('route', 'method'))
+request_queries = Histogram('http_request_queries', 'SQL statements issued by a request.', ('route', 'method'), QUERY_COUNT_BUCKETS)
+request_external_seconds = Histogram('http_request_external_seconds', 'Time a request spent waiting on an external service.', ('route', 'method', 'service'))
+external_call_seconds = Histogram('external_call_duration_seconds', 'Duration of individual calls to external services, in or out of requests.', ('service',))
+slow_queries = Counter('db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_THRESHOLD_MS.')
+
+HISTOGRAMS = [request_seconds, request_db_seconds, request_queries, request_external_seconds, external_call_seconds]
+
+class RequestTimings:
+    """
+    Per-request accumulators, kept on `flask.g` while a request is handled.
+    """
+    __slots__ = ('started', 'queries', 'db_seconds', 'external')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.external = {}
+
+def current_timings():
+    return g.get('request_timings') if has_request_context() else None
+
+@contextmanager
+def timed(service):
+    """
+    Time a call to an external service (s3, gemini, socketio), attributing
+    it to the current request when there is one.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        external_call_seconds.observe((service,), elapsed)
+        timings = current_timings()
+        if timings is not None:
+            timings.external[service] = timings.external.get(service, 0.0) + elapsed
+
+def route_labels():
+    # The URL rule, not the path, keeps label cardinality bounded
+    return (request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+
+def init_instrumentation(app, engine):
+    slow_query_seconds = (app.config['SLOW_QUERY_THRESHOLD_MS'] or 0) / 1000
+    server_timing = app.config['SERVER_TIMING_HEADER']
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        timings = current_timings()
+        if timings is not None:
+            timings.queries += 1
+            timings.db_seconds += elapsed
+        if slow_query_seconds and elapsed >= slow_query_seconds:
+            slow_queries.inc()
+            route = route_labels()[0] if has_request_context() else 'background'
+            print(f"Slow query ({elapsed * 1000:.1f} ms) in {route}: {' '.join(statement.split())} parameters={parameters!r}")
+
+    @event.listens_for(engine, 'handle_error')
+    def discard_query_timer(exception_context):
+        started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+        if started:
+            started.pop()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_timings = RequestTimings()
+
+    @app.after_request
+    def record_request_timings(response):
+        timings = g.pop('request_timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+        labels = route_labels()
+        request_seconds.observe(labels, total)
+        request_db_seconds.observe(labels, timings.db_seconds)
+        request_queries.observe(labels, timings.queries)
+        for service, seconds in timings.external.items():
+            request_external_seconds.observe(labels + (service,), seconds)
+
+        if server_timing:
+            metrics = [f'db;desc="{timings.queries} queries";dur={timings.db_seconds * 1000:.2f}']
+            metrics += [f'{service};dur={seconds * 1000:.2f}' for service, seconds in timings.external.items()]
+            metrics.append(f'total;dur={total * 1000:.2f}')
+            response.headers.add('Server-Timing', ', '.join(metrics))
+        return response
+
+def render_metrics(pool_status=None):
+    """
+    Returns:
+        str: All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    lines += slow_queries.render()
+    for name, value in (pool_status or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines += [f'# TYPE db_pool_{name} gauge', f'db_pool_{name} {value}']
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,70 @@
+# membership.py
+from flask import jsonify
+from sqlalchemy import exists
+from models import Group, Feed, user_group, db
+from cache import TTLCache
+
+# (user_id, group_code) -> (group_id, is_member); group_id is None for unknown codes
+memberships = TTLCache(maxsize=50000, ttl=60)
+
+# feed_id -> (group_id, group_code); a feed never moves between groups
+feed_groups = TTLCache(maxsize=50000, ttl=3600)
+
+def init_membership(app):
+    memberships.ttl = app.config['MEMBERSHIP_CACHE_TTL']
+
+def lookup_membership(user_id, group_code):
+    """
+    Resolve a group code and whether the user belongs to it in a single
+    indexed EXISTS query, cached per (user, group code).
+
+    Returns:
+        tuple: (group_id, is_member); group_id is None if the group does not exist or was deleted.
+    """
+    key = (user_id, group_code)
+    cached = memberships.get(key)
+    if cached is not None:
+        return cached
+
+    is_member = exists().where(user_group.c.user_id == user_id, user_group.c.group_id == Group.id)
+    row = db.session.query(Group.id, is_member).filter(Group.code == group_code, Group.deleted_at.is_(None)).first()
+    result = (row[0], bool(row[1])) if row else (None, False)
+    memberships.set(key, result)
+    return result
+
+def lookup_feed_group(feed_id):
+    """
+    Returns:
+        tuple: (group_id, group_code), or (None, None) if the feed does not exist.
+    """
+    cached = feed_groups.get(feed_id)
+    if cached is not None:
+        return cached
+
+    row = (db.session.query(Group.id, Group.code).join(Feed, Feed.group_id == Group.id)
+           .filter(Feed.id == feed_id, Group.deleted_at.is_(None)).first())
+    if not row:
+        return None, None
+    feed_groups.set(feed_id, (row[0], row[1]))
+    return row[0], row[1]
+
+def membership_error(group_id, is_member):
+    """
+    Returns:
+        tuple: A JSON error response and status code, or None if access is allowed.
+    """
+    if group_id is None:
+        return jsonify({'message': 'Group not found'}), 404
+    if not is_member:
+        return jsonify({'message': 'You are not a member of this group'}), 403
+    return None
+
+def invalidate_membership(user_id, group_code):
+    memberships.pop((user_id, group_code))
+
+def invalidate_group(group_code):
+    memberships.discard_where(lambda key, value: key[1] == group_code)
+    feed_groups.discard_where(lambda key, value: value[1] == group_code)
+
+def invalidate_feed(feed_id):
+    feed_groups.pop(feed_id)
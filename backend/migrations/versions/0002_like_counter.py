@@ -0,0 +1,39 @@
+"""feed.like_count counter and one like per user and feed
+
+Revision ID: 0002_like_counter
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_like_counter'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'like_count' not in {column['name'] for column in inspector.get_columns('feed')}:
+        with op.batch_alter_table('feed', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Duplicate likes from concurrent requests would block the unique constraint
+    op.execute('DELETE FROM "like" WHERE id NOT IN (SELECT MIN(id) FROM "like" GROUP BY user_id, feed_id)')
+    op.execute('UPDATE feed SET like_count = (SELECT COUNT(*) FROM "like" WHERE "like".feed_id = feed.id)')
+
+    if 'uq_like_user_feed' not in {constraint['name'] for constraint in inspector.get_unique_constraints('like')}:
+        with op.batch_alter_table('like', schema=None) as batch_op:
+            batch_op.create_unique_constraint('uq_like_user_feed', ['user_id', 'feed_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_like_user_feed', type_='unique')
+
+    with op.batch_alter_table('feed', schema=None) as batch_op:
+        batch_op.drop_column('like_count')
@@ -0,0 +1,40 @@
+"""indexes for the feed, comment, like, chat and membership hot paths
+
+On PostgreSQL the indexes are built CONCURRENTLY, so the upgrade does not
+block writes to tables that are already large.
+
+Revision ID: 0004_hot_path_indexes
+Revises: 0003_revoked_token
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_hot_path_indexes'
+down_revision = '0003_revoked_token'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_feed_group_created', 'feed', ['group_id', 'created_at', 'id']),
+    ('ix_feed_creator_created', 'feed', ['created_by', 'created_at', 'id']),
+    ('ix_comment_feed_added', 'comment', ['feed_id', 'added_at']),
+    ('ix_like_feed_id', 'like', ['feed_id']),
+    ('ix_chat_message_group_timestamp', 'chat_message', ['group_id', 'timestamp', 'id']),
+    ('ix_user_group_group_id', 'user_group', ['group_id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,31 @@
+"""user_group.last_read_at for per-group unread counts
+
+Revision ID: 0005_user_group_last_read
+Revises: 0004_hot_path_indexes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_user_group_last_read'
+down_revision = '0004_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_read_at', sa.DateTime(), nullable=True))
+
+    # Existing members start with nothing unread
+    op.get_bind().execute(sa.text('UPDATE user_group SET last_read_at = :now'), {'now': datetime.utcnow()})
+
+
+def downgrade():
+    with op.batch_alter_table('user_group', schema=None) as batch_op:
+        batch_op.drop_column('last_read_at')
@@ -0,0 +1,26 @@
+"""group.feed_version for validating cached feed pages
+
+Revision ID: 0006_group_feed_version
+Revises: 0005_user_group_last_read
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_group_feed_version'
+down_revision = '0005_user_group_last_read'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feed_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.drop_column('feed_version')
@@ -0,0 +1,37 @@
+"""group_change log and group.change_seq for delta sync
+
+Revision ID: 0007_group_change_log
+Revises: 0006_group_feed_version
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_group_change_log'
+down_revision = '0006_group_feed_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('group_change',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(length=32), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['group.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('group_id', 'seq')
+    )
+
+
+def downgrade():
+    op.drop_table('group_change')
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.drop_column('change_seq')
@@ -0,0 +1,149 @@
+"""full-text search index over feeds, comments and chat messages
+
+Revision ID: 0008_search_index
+Revises: 0007_group_change_log
+Create Date: 2026-10-18 21:00:00.000000
+
+PostgreSQL keeps a search_document table with a generated tsvector
+column under a GIN index; SQLite keeps an FTS5 table. Both are filled by
+triggers on feed, comment and chat_message, so every writer (including
+the chat write-behind and cascading deletes) keeps them current. Neither
+is part of the models; `flask search reindex` rebuilds them from scratch.
+
+On SQLite a batch migration that recreates feed, comment or chat_message
+drops their triggers, so such a migration has to create them again.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_search_index'
+down_revision = '0007_group_change_log'
+branch_labels = None
+depends_on = None
+
+# Indexed text of each source table; the same expressions are in search.py for reindexing
+SOURCES = {
+    'feed': {'body': "{row}.heading || ' ' || {row}.content", 'parent_id': 'NULL', 'group_id': '{row}.group_id',
+             'user_id': '{row}.created_by', 'created_at': '{row}.created_at', 'columns': 'heading, content'},
+    'comment': {'body': '{row}.comment', 'parent_id': '{row}.feed_id',
+                'group_id': '(SELECT group_id FROM feed WHERE feed.id = {row}.feed_id)',
+                'user_id': '{row}.user_id', 'created_at': '{row}.added_at', 'columns': 'comment'},
+    'chat_message': {'body': '{row}.message', 'parent_id': 'NULL', 'group_id': '{row}.group_id',
+                     'user_id': '{row}.user_id', 'created_at': '{row}.timestamp', 'columns': 'message'},
+}
+KINDS = {'feed': ('feed', 1), 'comment': ('comment', 2), 'chat_message': ('message', 3)}
+
+
+def values(table, row):
+    source = SOURCES[table]
+    kind, _ = KINDS[table]
+    return (f"'{kind}', {row}.id, " + ', '.join(source[name].format(row=row)
+                                                 for name in ('parent_id', 'group_id', 'user_id', 'created_at', 'body')))
+
+
+def upgrade_sqlite():
+    # rowid = id * 4 + kind code, so triggers find a source row's entry without a scan
+    op.execute("""
+        CREATE VIRTUAL TABLE search_index USING fts5(
+            body, kind UNINDEXED, ref_id UNINDEXED, parent_id UNINDEXED, group_id UNINDEXED,
+            user_id UNINDEXED, created_at UNINDEXED, tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    """)
+    for table, (_, code) in KINDS.items():
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO search_index (rowid, kind, ref_id, parent_id, group_id, user_id, created_at, body)
+                VALUES (new.id * 4 + {code}, {values(table, 'new')});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_update AFTER UPDATE OF {SOURCES[table]['columns']} ON {table} BEGIN
+                UPDATE search_index SET body = {SOURCES[table]['body'].format(row='new')} WHERE rowid = new.id * 4 + {code};
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM search_index WHERE rowid = old.id * 4 + {code};
+            END
+        """)
+
+
+def upgrade_postgresql():
+    op.execute("""
+        CREATE TABLE search_document (
+            kind VARCHAR(16) NOT NULL,
+            ref_id INTEGER NOT NULL,
+            parent_id INTEGER,
+            group_id INTEGER NOT NULL,
+            user_id INTEGER,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            body TEXT NOT NULL,
+            document TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', body)) STORED,
+            PRIMARY KEY (kind, ref_id)
+        )
+    """)
+    op.execute('CREATE INDEX ix_search_document_document ON search_document USING gin (document)')
+    for table, (kind, _) in KINDS.items():
+        # Inserts and deletes are handled per statement, so batch inserts and cascading
+        # deletes cost one statement each; updates only fire when the text changes
+        op.execute(f"""
+            CREATE FUNCTION search_{table}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO search_document (kind, ref_id, parent_id, group_id, user_id, created_at, body)
+                    SELECT {values(table, 'inserted')} FROM inserted;
+                ELSIF TG_OP = 'DELETE' THEN
+                    DELETE FROM search_document USING deleted
+                    WHERE search_document.kind = '{kind}' AND search_document.ref_id = deleted.id;
+                ELSE
+                    UPDATE search_document SET body = {SOURCES[table]['body'].format(row='NEW')}
+                    WHERE kind = '{kind}' AND ref_id = NEW.id;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS inserted FOR EACH STATEMENT EXECUTE FUNCTION search_{table}_sync()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS deleted FOR EACH STATEMENT EXECUTE FUNCTION search_{table}_sync()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_{table}_update AFTER UPDATE OF {SOURCES[table]['columns']} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION search_{table}_sync()
+        """)
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    if postgresql:
+        upgrade_postgresql()
+    else:
+        upgrade_sqlite()
+
+    # Index what is already there
+    for table, (_, code) in KINDS.items():
+        if postgresql:
+            op.execute('INSERT INTO search_document (kind, ref_id, parent_id, group_id, user_id, created_at, body) '
+                       f'SELECT {values(table, table)} FROM {table}')
+        else:
+            op.execute('INSERT INTO search_index (rowid, kind, ref_id, parent_id, group_id, user_id, created_at, body) '
+                       f'SELECT {table}.id * 4 + {code}, {values(table, table)} FROM {table}')
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for table in KINDS:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS search_{table}_{action}' + (f' ON {table}' if postgresql else ''))
+    if postgresql:
+        for table in KINDS:
+            op.execute(f'DROP FUNCTION IF EXISTS search_{table}_sync()')
+        op.execute('DROP TABLE search_document')
+    else:
+        op.execute('DROP TABLE search_index')
@@ -0,0 +1,40 @@
+"""group.deleted_at tombstones and the photo_deletion queue
+
+Revision ID: 0009_background_deletion
+Revises: 0008_search_index
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_background_deletion'
+down_revision = '0008_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    op.create_table('photo_deletion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('photo_deletion', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_photo_deletion_next_attempt_at'), ['next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('photo_deletion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_photo_deletion_next_attempt_at'))
+    op.drop_table('photo_deletion')
+
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -6,7 +6,9 @@ db = SQLAlchemy()
 # Association table for User-Group relationship
 user_group = db.Table('user_group',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('group_id', db.Integer, db.ForeignKey('group.id'), primary_key=True)
+    db.Column('group_id', db.Integer, db.ForeignKey('group.id'), primary_key=True),
+    db.Column('last_read_at', db.DateTime, nullable=True, default=datetime.utcnow),
+    db.Index('ix_user_group_group_id', 'group_id')
 )
 
 class User(db.Model):
@@ -15,11 +17,11 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(60), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    feeds = db.relationship('Feed', backref='creator', lazy=True, cascade="all, delete-orphan")
-    comments = db.relationship('Comment', backref='author', lazy=True, cascade="all, delete-orphan")
+    feeds = db.relationship('Feed', backref='creator', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    comments = db.relationship('Comment', backref='author', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
     groups = db.relationship('Group', secondary=user_group, back_populates='members', lazy='dynamic')
-    messages = db.relationship('ChatMessage', backref='author', lazy=True, cascade="all, delete-orphan")
-    likes = db.relationship('Like', backref='user', lazy=True, cascade="all, delete-orphan")
+    messages = db.relationship('ChatMessage', backref='author', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    likes = db.relationship('Like', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
 class TodoItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,10 +36,20 @@ class Group(db.Model):
     description = db.Column(db.String(255), nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    feeds = db.relationship('Feed', backref='group', lazy=True, cascade="all, delete-orphan")
+    # Bumped by every change to the group's feeds, comments or likes; versions cached feed pages
+    feed_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Sequence number of the group's latest entry in group_change
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Set by delete_group; the group is hidden at once and purged in the background (cleanup.py)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    feeds = db.relationship('Feed', backref='group', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
     members = db.relationship('User', secondary=user_group, back_populates='groups', lazy='dynamic')
 
 class Feed(db.Model):
+    __table_args__ = (
+        db.Index('ix_feed_group_created', 'group_id', 'created_at', 'id'),
+        db.Index('ix_feed_creator_created', 'created_by', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     heading = db.Column(db.String(150), nullable=False)
     content = db.Column(db.String(500), nullable=False)
@@ -45,10 +57,12 @@ class Feed(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    comments = db.relationship('Comment', backref='post', lazy=True, cascade="all, delete-orphan")
-    likes = db.relationship('Like', backref='feed', lazy=True, cascade="all, delete-orphan")
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments = db.relationship('Comment', backref='post', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    likes = db.relationship('Like', backref='feed', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
 class Comment(db.Model):
+    __table_args__ = (db.Index('ix_comment_feed_added', 'feed_id', 'added_at'),)
     id = db.Column(db.Integer, primary_key=True)
     feed_id = db.Column(db.Integer, db.ForeignKey('feed.id', ondelete='CASCADE'), nullable=False)
     comment = db.Column(db.String(300), nullable=False)
@@ -56,6 +70,7 @@ class Comment(db.Model):
     added_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 class ChatMessage(db.Model):
+    __table_args__ = (db.Index('ix_chat_message_group_timestamp', 'group_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id', ondelete='CASCADE'), nullable=False)
@@ -63,7 +78,32 @@ class ChatMessage(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 class Like(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'feed_id', name='uq_like_user_feed'),
+        db.Index('ix_like_feed_id', 'feed_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     feed_id = db.Column(db.Integer, db.ForeignKey('feed.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class GroupChange(db.Model):
+    # Bounded log of the events emitted to a group's room, replayed by /group/<code>/changes
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id', ondelete='CASCADE'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class PhotoDeletion(db.Model):
+    # Photo files of deleted or re-pictured feeds, removed from S3 in the background (cleanup.py)
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class RevokedToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
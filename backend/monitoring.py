@@ -0,0 +1,15 @@
+# monitoring.py
+from flask import Blueprint, Response, jsonify
+from database import get_pool_status
+from instrumentation import render_metrics
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+@monitoring_bp.route('/pool', methods=['GET'])
+def pool_status():
+    return jsonify(get_pool_status()), 200
+
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(get_pool_status()), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,102 @@
+# passwords.py
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+class PasswordHasherBusy(Exception):
+    pass
+
+def hash_rounds(hashed):
+    """
+    Returns:
+        int: The bcrypt cost a stored hash was created with, None if it is not a bcrypt hash.
+    """
+    parts = hashed.split('$')
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+def green_offload():
+    """
+    Returns:
+        callable: Runs a function on a native thread without blocking the
+        event loop, or None when the server is not monkey patched.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute
+    if 'gevent' in sys.modules:
+        from gevent import get_hub, monkey
+        if monkey.is_module_patched('threading'):
+            return lambda fn, *args: get_hub().threadpool.apply(fn, args)
+    return None
+
+class PasswordHasher:
+    """
+    bcrypt hashing and checking off the request threads.
+
+    bcrypt releases the GIL, so a small thread pool hashes in parallel
+    while other requests keep running. Under eventlet or gevent the pool
+    threads would be green and block the loop, so the work goes to the
+    server's native thread pool instead. At most `max_workers` hashes run
+    at once; beyond `max_pending` waiting calls, new ones are refused.
+    """
+
+    def __init__(self, rounds=12, max_workers=4, max_pending=64):
+        self.configure(rounds, max_workers, max_pending)
+
+    def configure(self, rounds, max_workers, max_pending):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash') if max_workers else None
+        self._workers = threading.BoundedSemaphore(max_workers or 1)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, fn, *args):
+        # max_workers = 0 hashes inline, as before the pool existed
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many logins in progress, try again shortly')
+        try:
+            offload = green_offload()
+            if offload is None:
+                return self._executor.submit(fn, *args).result()
+            with self._workers:
+                return offload(fn, *args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """
+        Raises:
+            PasswordHasherBusy: If too many hashes are already waiting.
+        """
+        return self._run(self._hash, password, self.rounds)
+
+    def check(self, hashed, password):
+        """
+        Raises:
+            PasswordHasherBusy: If too many hashes are already waiting.
+        """
+        return self._run(self._check, hashed, password)
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    @staticmethod
+    def _hash(password, rounds):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+    @staticmethod
+    def _check(hashed, password):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+hasher = PasswordHasher()
+
+def init_passwords(app):
+    hasher.configure(app.config['BCRYPT_LOG_ROUNDS'], app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_MAX_PENDING'])
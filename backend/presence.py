@@ -0,0 +1,203 @@
+# presence.py
+import threading
+import time
+from serializers import EncodedJSON
+
+class SocketPresence:
+    __slots__ = ('user_id', 'rooms')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.rooms = ()
+
+class UserPresence:
+    __slots__ = ('username', 'sids')
+
+    def __init__(self, username):
+        self.username = username
+        self.sids = ()
+
+class RoomPresence:
+    """
+    Who is in one room. `members` counts each user's sockets in the room;
+    `joined`/`left` map the users that changed since the last presence
+    event to their usernames.
+    """
+    __slots__ = ('members', 'typing', 'joined', 'left', 'typing_changed')
+
+    def __init__(self):
+        self.members = {}
+        self.typing = {}
+        self.joined = {}
+        self.left = {}
+        self.typing_changed = False
+
+class PresenceRegistry:
+    """
+    In-memory record of connected sockets, the users behind them and the
+    rooms they joined, for "who's online" and typing indicators without
+    queries. Changes are not emitted one by one: every `interval` seconds
+    each changed room gets a single `presence` event with the users that
+    came online, went offline and the current typists. Each process only
+    knows its own sockets.
+    """
+
+    def __init__(self, interval=1.0, typing_ttl=5.0):
+        self.interval = interval
+        self.typing_ttl = typing_ttl
+        self._sockets = {}
+        self._users = {}
+        self._rooms = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def connect(self, sid, user_id, username, start_background_task):
+        with self._lock:
+            self._sockets[sid] = SocketPresence(user_id)
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = UserPresence(username)
+            user.sids += (sid,)
+            if not self._started:
+                self._started = True
+                start_background_task(self._run)
+
+    def disconnect(self, sid):
+        with self._lock:
+            socket = self._sockets.pop(sid, None)
+            if socket is None:
+                return
+            for room in socket.rooms:
+                self._leave(socket.user_id, room)
+            user = self._users[socket.user_id]
+            user.sids = tuple(other for other in user.sids if other != sid)
+            if not user.sids:
+                del self._users[socket.user_id]
+
+    def user_id(self, sid):
+        socket = self._sockets.get(sid)
+        return socket.user_id if socket else None
+
+    def join(self, sid, room):
+        with self._lock:
+            socket = self._sockets.get(sid)
+            if socket is None or room in socket.rooms:
+                return
+            socket.rooms += (room,)
+            presence = self._rooms.get(room)
+            if presence is None:
+                presence = self._rooms[room] = RoomPresence()
+            count = presence.members.get(socket.user_id, 0)
+            presence.members[socket.user_id] = count + 1
+            if not count:
+                self._changed(presence, room, socket.user_id, online=True)
+
+    def leave(self, sid, room):
+        with self._lock:
+            socket = self._sockets.get(sid)
+            if socket is None or room not in socket.rooms:
+                return
+            socket.rooms = tuple(joined for joined in socket.rooms if joined != room)
+            self._leave(socket.user_id, room)
+
+    def _leave(self, user_id, room):
+        presence = self._rooms[room]
+        count = presence.members[user_id] - 1
+        if count:
+            presence.members[user_id] = count
+            return
+        del presence.members[user_id]
+        if presence.typing.pop(user_id, None) is not None:
+            presence.typing_changed = True
+        self._changed(presence, room, user_id, online=False)
+
+    def _changed(self, presence, room, user_id, online):
+        # Coming and going within one interval cancels out
+        arrived, departed = (presence.joined, presence.left) if online else (presence.left, presence.joined)
+        if departed.pop(user_id, None) is None:
+            arrived[user_id] = self._users[user_id].username
+        self._dirty.add(room)
+
+    def sockets_of(self, user_id, room):
+        with self._lock:
+            user = self._users.get(user_id)
+            return [sid for sid in user.sids if room in self._sockets[sid].rooms] if user else []
+
+    def set_typing(self, sid, room, typing):
+        with self._lock:
+            socket = self._sockets.get(sid)
+            if socket is None or room not in socket.rooms:
+                return
+            presence = self._rooms[room]
+            if typing:
+                if socket.user_id not in presence.typing:
+                    presence.typing_changed = True
+                presence.typing[socket.user_id] = time.monotonic() + self.typing_ttl
+            elif presence.typing.pop(socket.user_id, None) is not None:
+                presence.typing_changed = True
+            if presence.typing_changed:
+                self._dirty.add(room)
+
+    def online(self, room):
+        """
+        Returns:
+            dict: Usernames online in the room and those typing.
+        """
+        with self._lock:
+            presence = self._rooms.get(room)
+            if presence is None:
+                return {'online': [], 'typing': []}
+            return {'online': sorted(self._users[user_id].username for user_id in presence.members),
+                    'typing': sorted(self._users[user_id].username for user_id in presence.typing)}
+
+    def changes(self):
+        """
+        Collect and reset the changes of every room since the last call.
+
+        Returns:
+            list: (room, payload) pairs.
+        """
+        now = time.monotonic()
+        events = []
+        with self._lock:
+            for room, presence in self._rooms.items():
+                expired = [user_id for user_id, expires in presence.typing.items() if expires <= now]
+                for user_id in expired:
+                    del presence.typing[user_id]
+                if expired:
+                    presence.typing_changed = True
+                    self._dirty.add(room)
+            for room in self._dirty:
+                presence = self._rooms[room]
+                if not (presence.joined or presence.left or presence.typing_changed):
+                    continue
+                payload = {'groupCode': room, 'count': len(presence.members)}
+                if presence.joined:
+                    payload['online'] = sorted(presence.joined.values())
+                if presence.left:
+                    payload['offline'] = sorted(presence.left.values())
+                if presence.typing_changed:
+                    payload['typing'] = sorted(self._users[user_id].username for user_id in presence.typing)
+                events.append((room, payload))
+                presence.joined.clear()
+                presence.left.clear()
+                presence.typing_changed = False
+            self._dirty.clear()
+            for room in [room for room, presence in self._rooms.items() if not presence.members]:
+                del self._rooms[room]
+        return events
+
+    def _run(self):
+        from socketio_module import socketio
+        from events import dispatcher
+        while True:
+            socketio.sleep(self.interval)
+            for room, payload in self.changes():
+                dispatcher.enqueue('presence', EncodedJSON(payload), room=room)
+
+presence = PresenceRegistry()
+
+def init_presence(app):
+    presence.interval = app.config['PRESENCE_INTERVAL']
+    presence.typing_ttl = app.config['PRESENCE_TYPING_TTL']
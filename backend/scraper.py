@@ -9,7 +9,15 @@ import requests
 
 scraper_bp = Blueprint('scraper', __name__)
 
+def ensure_punkt():
+    # Fetched on first use rather than at import, which needs the network
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+
 def summarize(content):
+    ensure_punkt()
     parser = PlaintextParser.from_string(content, Tokenizer("english"))
     summarizer = LsaSummarizer()
     summary = summarizer(parser.document, sentences_count=3)  
@@ -0,0 +1,202 @@
+# search.py
+import base64
+import json
+import re
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import text
+from models import db
+from membership import lookup_membership, membership_error
+from serializers import json_response, timestamp
+
+# `flask search reindex` rebuilds the index
+search_bp = Blueprint('search', __name__, cli_group='search')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+TERM = re.compile(r'\w+')
+
+# kind -> (code in SQLite rowids, query of the indexed rows); the same columns
+# the triggers of migration 0008_search_index index on every write
+SOURCES = {
+    'feed': (1, "SELECT id, CAST(NULL AS INTEGER), group_id, created_by, created_at, heading || ' ' || content FROM feed"),
+    'comment': (2, 'SELECT comment.id, comment.feed_id, feed.group_id, comment.user_id, comment.added_at, comment.comment '
+                   'FROM comment JOIN feed ON feed.id = comment.feed_id'),
+    'message': (3, 'SELECT id, CAST(NULL AS INTEGER), group_id, user_id, timestamp, message FROM chat_message'),
+}
+
+# Matches in the caller's groups, best first; ties are broken by (kind, ref_id)
+SQLITE_SEARCH = """
+    SELECT hit.*, g.code, u.username FROM (
+        SELECT s.kind, s.ref_id, s.parent_id, s.group_id, s.user_id, s.created_at,
+               -bm25(search_index) AS score, snippet(search_index, 0, '', '', '…', 16) AS snippet
+        FROM search_index s
+        JOIN user_group ug ON ug.group_id = s.group_id AND ug.user_id = :user_id
+        WHERE search_index MATCH :query {filters}
+    ) hit
+    JOIN "group" g ON g.id = hit.group_id
+    LEFT JOIN "user" u ON u.id = hit.user_id
+    {after}
+    ORDER BY hit.score DESC, hit.kind, hit.ref_id
+    LIMIT :limit
+"""
+
+# Headlines re-parse the text, so they are only made for the returned page
+POSTGRES_SEARCH = """
+    SELECT page.*, ts_headline('english', page.body, plainto_tsquery('english', :query),
+                               'MinWords=8, MaxWords=20, StartSel="", StopSel=""') AS snippet
+    FROM (
+        SELECT hit.*, g.code, u.username FROM (
+            SELECT d.kind, d.ref_id, d.parent_id, d.group_id, d.user_id, d.created_at, d.body,
+                   ts_rank(d.document, plainto_tsquery('english', :query))::float8 AS score
+            FROM search_document d
+            JOIN user_group ug ON ug.group_id = d.group_id AND ug.user_id = :user_id
+            WHERE d.document @@ plainto_tsquery('english', :query) {filters}
+        ) hit
+        JOIN "group" g ON g.id = hit.group_id
+        LEFT JOIN "user" u ON u.id = hit.user_id
+        {after}
+        ORDER BY hit.score DESC, hit.kind, hit.ref_id
+        LIMIT :limit
+    ) page
+    ORDER BY page.score DESC, page.kind, page.ref_id
+"""
+
+def encode_search_cursor(score, kind, ref_id):
+    raw = json.dumps([score, kind, ref_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_search_cursor(cursor):
+    """
+    Returns:
+        tuple: (score, kind, ref_id)
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        score, kind, ref_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(score), str(kind), int(ref_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def search_rows(user_id, query, group_id=None, kind=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of ranked matches of `query` in the groups of `user_id`.
+
+    Args:
+        after (tuple): Position of the last hit of the previous page, see `decode_search_cursor`.
+
+    Returns:
+        list: Rows with kind, ref_id, parent_id, code, username, created_at, score and snippet.
+    """
+    params = {'user_id': user_id, 'limit': limit}
+    filters = ''
+    if group_id is not None:
+        filters += ' AND ug.group_id = :group_id'
+        params['group_id'] = group_id
+    if kind is not None:
+        filters += ' AND kind = :kind'
+        params['kind'] = kind
+    after_clause = ''
+    if after is not None:
+        after_clause = 'WHERE hit.score < :score OR (hit.score = :score AND (hit.kind, hit.ref_id) > (:after_kind, :after_id))'
+        params.update(score=after[0], after_kind=after[1], after_id=after[2])
+
+    if db.engine.dialect.name == 'postgresql':
+        params['query'] = query
+        statement = POSTGRES_SEARCH
+    else:
+        # Every word must match; quoting keeps FTS5 operators in the input literal
+        params['query'] = ' '.join(f'"{term}"' for term in TERM.findall(query))
+        statement = SQLITE_SEARCH
+    return db.session.execute(text(statement.format(filters=filters, after=after_clause)), params).all()
+
+def serialize_hit(row):
+    created_at = row.created_at
+    if isinstance(created_at, str):
+        # Stored as text by SQLite
+        created_at = datetime.fromisoformat(created_at)
+    hit = {
+        'type': row.kind,
+        'id': row.ref_id,
+        'groupCode': row.code,
+        'user': row.username,
+        'timestamp': timestamp(created_at),
+        'snippet': row.snippet,
+        'score': row.score
+    }
+    if row.kind == 'comment':
+        hit['feed_id'] = row.parent_id
+    return hit
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    Full-text search over the feeds, comments and chat messages of the
+    caller's groups, best matches first. `groupCode` and `type` (feed,
+    comment or message) narrow it down; pages continue from `cursor`.
+    """
+    user_id = get_jwt_identity()
+    query = request.args.get('q', '')
+    if not TERM.search(query):
+        return jsonify({'message': 'q is required'}), 400
+    kind = request.args.get('type')
+    if kind is not None and kind not in SOURCES:
+        return jsonify({'message': f"type must be one of {', '.join(SOURCES)}"}), 400
+    limit = min(max(request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    group_id = None
+    group_code = request.args.get('groupCode')
+    if group_code:
+        group_id, is_member = lookup_membership(user_id, group_code)
+        error = membership_error(group_id, is_member)
+        if error:
+            return error
+
+    rows = search_rows(user_id, query, group_id, kind, after, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = rows[-1] if rows else None
+    return json_response({
+        'results': [serialize_hit(row) for row in rows],
+        'has_more': has_more,
+        'next_cursor': encode_search_cursor(last.score, last.kind, last.ref_id) if has_more else None
+    })
+
+def reindex():
+    """
+    Rebuild the whole index in one transaction, e.g. after restoring data
+    with the triggers disabled.
+
+    Returns:
+        dict: Number of indexed rows per kind.
+    """
+    counts = {}
+    with db.engine.begin() as conn:
+        postgresql = conn.dialect.name == 'postgresql'
+        conn.execute(text('TRUNCATE search_document' if postgresql else 'DELETE FROM search_index'))
+        for kind, (code, source) in SOURCES.items():
+            if postgresql:
+                statement = (f"INSERT INTO search_document (kind, ref_id, parent_id, group_id, user_id, created_at, body) "
+                             f"SELECT '{kind}', source.* FROM ({source}) source")
+            else:
+                statement = (f"INSERT INTO search_index (rowid, kind, ref_id, parent_id, group_id, user_id, created_at, body) "
+                             f"SELECT source.id * 4 + {code}, '{kind}', source.* FROM ({source}) source")
+            counts[kind] = conn.execute(text(statement)).rowcount
+        if not postgresql:
+            conn.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    return counts
+
+@search_bp.cli.command('reindex')
+def reindex_command():
+    """Rebuild the full-text search index from feeds, comments and chat messages."""
+    counts = reindex()
+    print(', '.join(f'{count} {kind} rows' for kind, count in counts.items()) + ' indexed.')
@@ -0,0 +1,105 @@
+# serializers.py
+import json
+from collections import namedtuple
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+# Column order of the feed rows the serializers expect, see `feed_row`
+FeedRow = namedtuple('FeedRow', ['id', 'heading', 'content', 'picture', 'username', 'created_at', 'like_count'])
+
+def timestamp(moment):
+    """
+    ISO 8601 in UTC. Timestamps are stored as naive UTC, so the zone is
+    spelled out for clients that would otherwise read them as local time.
+    """
+    return moment.isoformat() + 'Z' if moment is not None else None
+
+def dumps(payload):
+    """
+    Returns:
+        str: Compact JSON for a payload of plain dicts, lists, strings and numbers.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload).decode('utf-8')
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+class EncodedJSON:
+    """
+    A payload encoded once. The same text is used as an HTTP response body
+    and, through `SocketIOJSON`, spliced into every Socket.IO packet that
+    carries it.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, payload):
+        self.text = dumps(payload)
+
+    @classmethod
+    def from_text(cls, text):
+        # Wraps JSON that was encoded earlier, e.g. a stored change log payload
+        encoded = cls.__new__(cls)
+        encoded.text = text
+        return encoded
+
+    def __getstate__(self):
+        # Picklable for Socket.IO message queues
+        return self.text
+
+    def __setstate__(self, text):
+        self.text = text
+
+    def response(self, status=200):
+        return Response(self.text, status=status, mimetype='application/json')
+
+def json_response(payload, status=200):
+    return EncodedJSON(payload).response(status)
+
+class SocketIOJSON:
+    """
+    JSON module for python-socketio. Packet data is a list of the event
+    name and its arguments; already encoded arguments are copied as is.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        if isinstance(obj, list) and any(isinstance(item, EncodedJSON) for item in obj):
+            return '[' + ','.join(item.text if isinstance(item, EncodedJSON) else json.dumps(item, **kwargs) for item in obj) + ']'
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(text, **kwargs):
+        return json.loads(text, **kwargs)
+
+def feed_row(feed, username):
+    return FeedRow(feed.id, feed.heading, feed.content, feed.picture, username, feed.created_at, feed.like_count)
+
+def serialize_feed(row, comments, group_code=None):
+    payload = {
+        'id': row.id,
+        'heading': row.heading,
+        'content': row.content,
+        'picture': row.picture,
+        'created_by': row.username,
+        'created_at': timestamp(row.created_at),
+        'likes': row.like_count,
+        'comments': comments,
+    }
+    if group_code is not None:
+        payload['groupCode'] = group_code
+    return payload
+
+def serialize_comment(comment_id, text, username, added_at):
+    return {'id': comment_id, 'comment': text, 'added_by': username, 'added_at': timestamp(added_at)}
+
+def serialize_message(message_id, username, text, sent_at, group_code=None):
+    payload = {'id': message_id, 'user': username, 'text': text, 'timestamp': timestamp(sent_at)}
+    if group_code is not None:
+        payload['groupCode'] = group_code
+    return payload
+
+def serialize_group(group_id, name, code, description, created_by):
+    return {'id': group_id, 'name': name, 'code': code, 'description': description, 'created_by': created_by}
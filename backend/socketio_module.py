@@ -1,33 +1,84 @@
 # socketio_module.py
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from flask_jwt_extended import get_jwt_identity
-from models import db, ChatMessage, User, Group
+from flask import current_app, request
+from flask_socketio import SocketIO, join_room, leave_room
+from flask_jwt_extended import decode_token
 from constants import FRONTEND_SERVERS
+from serializers import SocketIOJSON
+from blacklist import blacklist
+from auth import get_username
+from membership import lookup_membership
+from presence import presence
 
 socketio = SocketIO()
 
 def init_socketio(app):
-    socketio.init_app(app, cors_allowed_origins=FRONTEND_SERVERS)
+    # With a message queue (e.g. redis://), several server processes share rooms
+    # SocketIOJSON sends payloads encoded by serializers.EncodedJSON without re-encoding them
+    socketio.init_app(app, cors_allowed_origins=FRONTEND_SERVERS, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'], json=SocketIOJSON)
 
-@socketio.on('connect')
-def handle_connect():
+def authenticate(auth):
+    """
+    Validate the access token a client sends when connecting, as
+    `io(url, {auth: {token}})`.
+
+    Returns:
+        int: The user id.
+
+    Raises:
+        ConnectionRefusedError: If the token is missing, invalid, expired or revoked.
+    """
+    token = (auth or {}).get('token')
+    if not token:
+        raise ConnectionRefusedError('Missing access token')
     try:
-        return True
+        claims = decode_token(token)
     except Exception as e:
-        print(f"Connection rejected: {str(e)}")
-        return False
+        raise ConnectionRefusedError(f'Invalid access token: {e}')
+    if claims.get('type') != 'access' or blacklist.is_revoked(claims['jti']):
+        raise ConnectionRefusedError('Invalid access token')
+    return claims[current_app.config['JWT_IDENTITY_CLAIM']]
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    user_id = authenticate(auth)
+    presence.connect(request.sid, user_id, get_username(user_id), socketio.start_background_task)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    presence.disconnect(request.sid)
 
 @socketio.on('join')
 def on_join(data):
+    """
+    Returns:
+        dict: Acknowledgement with an `error` when the join is refused.
+    """
     try:
         room = data['groupCode']
+        group_id, is_member = lookup_membership(presence.user_id(request.sid), room)
+        if not is_member:
+            return {'error': 'Group not found' if group_id is None else 'You are not a member of this group'}
         join_room(room)
-        print(f"User joined room: {room}")
+        presence.join(request.sid, room)
+        return {'joined': room}
     except Exception as e:
         print(f"Error in on_join: {str(e)}")
+        return {'error': str(e)}
 
 @socketio.on('leave')
 def on_leave(data):
     room = data['groupCode']
     leave_room(room)
-    print(f"User left room: {room}")
+    presence.leave(request.sid, room)
+
+@socketio.on('typing')
+def on_typing(data):
+    presence.set_typing(request.sid, data['groupCode'], bool(data.get('typing', True)))
+
+def remove_from_room(user_id, room):
+    """
+    Take a user's sockets out of a group's room, e.g. after they left the group.
+    """
+    for sid in presence.sockets_of(user_id, room):
+        socketio.server.leave_room(sid, room, namespace='/')
+        presence.leave(sid, room)
@@ -0,0 +1,83 @@
+# tests/conftest.py
+"""
+The app is created on import, so the database is chosen here first: a
+throwaway SQLite file migrated with `bootstrap_database()`, shared by the
+whole session. Run from backend/ with `python -m pytest`.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+WORKDIR = tempfile.mkdtemp(prefix='backend-tests-')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, bootstrap_database
+    from benchmarks.stubs import install_stubs
+    from blacklist import blacklist
+    from chat_log import chat_log
+    from cleanup import cleanup
+    with app.app_context():
+        bootstrap_database()
+        # Sync the revocation list now, so requests never do
+        blacklist.sync_interval = blacklist.purge_interval = 24 * 3600
+        blacklist.sync()
+    install_stubs(app)
+    # Reads should hit the database, and nothing should run behind the test's back
+    chat_log.serve_reads = False
+    cleanup.schedule = lambda start_background_task: None
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def db(app):
+    from models import db
+    with app.app_context():
+        yield db
+
+@pytest.fixture
+def count_queries(db):
+    """
+    Context manager counting the SQL statements run inside it; the caches
+    in front of the database are emptied first.
+    """
+    from sqlalchemy import event
+    from feed_cache import feed_pages
+    from membership import memberships, feed_groups
+
+    @contextmanager
+    def counting():
+        for cache in (feed_pages, memberships, feed_groups):
+            cache.clear()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counting
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+
+    def headers(user_id):
+        with app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+    return headers
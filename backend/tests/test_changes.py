@@ -0,0 +1,42 @@
+# tests/test_changes.py
+"""
+A write touches its group's row once, numbering the change-log entry and
+bumping the feed version in one statement.
+"""
+import pytest
+
+@pytest.fixture(scope='module')
+def change_group(app):
+    from models import Feed, Group, User, db
+    with app.app_context():
+        user = User(username='changes0', email='changes0@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        group = Group(name='Changes', code='CHANGE', description='', created_by=user.id)
+        db.session.add(group)
+        db.session.flush()
+        user.groups.append(group)
+        feed = Feed(heading='Feed', content='content', created_by=user.id, group_id=group.id)
+        db.session.add(feed)
+        db.session.commit()
+        return {'user_id': user.id, 'group_id': group.id, 'feed_id': feed.id}
+
+def group_counters(db, group_id):
+    from models import Group
+    db.session.rollback()
+    return db.session.query(Group.change_seq, Group.feed_version).filter(Group.id == group_id).one()
+
+def test_comment_updates_the_group_row_once(client, db, count_queries, auth_headers, change_group):
+    seq, version = group_counters(db, change_group['group_id'])
+    with count_queries() as statements:
+        response = client.post('/addComment', json={'feed_id': change_group['feed_id'], 'comment': 'hello'},
+                               headers=auth_headers(change_group['user_id']))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+    group_updates = [statement for statement in statements if statement.lstrip().startswith('UPDATE "group"')]
+    assert len(group_updates) == 1
+    assert group_counters(db, change_group['group_id']) == (seq + 1, version + 1)
+
+    changes = client.get(f'/group/CHANGE/changes?since={seq}', headers=auth_headers(change_group['user_id'])).get_json()
+    assert [(change['seq'], change['event']) for change in changes['changes']] == [(seq + 1, 'new_comment')]
+    assert changes['changes'][0]['data']['seq'] == seq + 1
@@ -0,0 +1,80 @@
+# tests/test_chat_log.py
+"""
+The chat write-behind queue is bounded, backs off while the database is
+failing and fails waiting senders of messages it drops.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+@pytest.fixture
+def chat_group(app):
+    from models import Group, User, db
+    with app.app_context():
+        user = db.session.query(User).filter_by(username='chatter0').first()
+        if user is None:
+            user = User(username='chatter0', email='chatter0@example.com', password='x')
+            db.session.add(user)
+            db.session.flush()
+            group = Group(name='Chat', code='CHATS1', description='', created_by=user.id)
+            db.session.add(group)
+            db.session.flush()
+            user.groups.append(group)
+            db.session.commit()
+        return user.id, db.session.query(Group.id).filter_by(code='CHATS1').scalar()
+
+@pytest.fixture
+def log(db):
+    from chat_log import ChatLog
+    log = ChatLog(flush_interval=0.2, max_pending=3, max_retry_delay=1)
+    log.engine = db.engine
+    return log
+
+def append(log, group_id, user_id, wait=False):
+    return log.append(group_id, 'CHATS1', user_id, 'chatter0', 'hello', lambda task: None, wait=wait)
+
+def test_full_queue_refuses_messages(log, chat_group):
+    from chat_log import ChatLogFull
+    user_id, group_id = chat_group
+    for _ in range(3):
+        append(log, group_id, user_id)
+    with pytest.raises(ChatLogFull):
+        append(log, group_id, user_id)
+    log.flush()
+    append(log, group_id, user_id)
+
+def test_failed_writes_back_off(log, chat_group, monkeypatch):
+    user_id, group_id = chat_group
+    _, written = append(log, group_id, user_id, wait=True)
+    working_engine, log.engine = log.engine, create_engine('sqlite:////nonexistent/chat.db')
+
+    log.flush()
+    assert log._failures == 1 and len(log._pending) == 1
+    # Still within the retry delay: nothing is attempted
+    monkeypatch.setattr(log, '_write', lambda batch: pytest.fail('flushed during the retry delay'))
+    log.flush_due()
+    monkeypatch.undo()
+
+    log._retry_at = 0
+    log.flush_due()
+    assert log._failures == 2 and not written.done()
+
+    log.engine = working_engine
+    log._retry_at = 0
+    log.flush_due()
+    assert written.result(timeout=1) is True
+    assert log._failures == 0 and not log._pending
+
+def test_forget_fails_waiting_senders(log, chat_group):
+    from chat_log import MessageDropped
+    user_id, group_id = chat_group
+    _, written = append(log, group_id, user_id, wait=True)
+    log.forget(group_id)
+    with pytest.raises(MessageDropped):
+        written.result(timeout=0)
+
+def test_send_is_refused_when_the_queue_is_full(client, auth_headers, chat_group, monkeypatch):
+    from chat_log import chat_log
+    user_id, _ = chat_group
+    monkeypatch.setattr(chat_log, 'max_pending', 0)
+    response = client.post('/group/CHATS1/messages', json={'content': 'hello'}, headers=auth_headers(user_id))
+    assert response.status_code == 503
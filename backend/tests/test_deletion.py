@@ -0,0 +1,53 @@
+# tests/test_deletion.py
+"""
+Deleting a group hides it at once; its rows and photo files are removed
+later by the cleanup task.
+"""
+from constants import AWS_BUCKET
+
+def test_deleted_group_disappears_before_it_is_purged(app, client, db, auth_headers):
+    import utils
+    from cleanup import cleanup
+    from images import new_photo_filename, photo_keys
+    from models import ChatMessage, Comment, Feed, Group, PhotoDeletion, User
+
+    user = User(username='deleter0', email='deleter0@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+    groups = [Group(name=f'Deleted {i}', code=f'DELET{i}', description='', created_by=user.id) for i in range(2)]
+    db.session.add_all(groups)
+    db.session.flush()
+    pictures = [new_photo_filename(i) for i in range(len(groups))]
+    for group, picture in zip(groups, pictures):
+        user.groups.append(group)
+        feed = Feed(heading=group.code, content='content', created_by=user.id, group_id=group.id, picture=picture)
+        db.session.add(feed)
+        db.session.flush()
+        db.session.add(Comment(feed_id=feed.id, comment='comment', user_id=user.id))
+        db.session.add(ChatMessage(group_id=group.id, user_id=user.id, message='message'))
+    db.session.commit()
+    deleted_id = groups[0].id
+    s3 = utils.get_s3()
+    for key in photo_keys(pictures[0]):
+        s3.put_object(Bucket=AWS_BUCKET, Key=key, Body=b'photo')
+
+    headers = auth_headers(user.id)
+    assert client.delete('/group/DELET0', headers=headers).status_code == 200
+
+    assert client.get('/about/DELET0', headers=headers).status_code == 404
+    assert client.get('/getAllFeeds?groupCode=DELET0', headers=headers).status_code == 404
+    assert [group['code'] for group in client.get('/user/groups', headers=headers).get_json()['groups']] == ['DELET1']
+    for path in ('/getUserData?username=deleter0&include_total=true', '/getUserData?username=deleter0&cursor=&include_total=true'):
+        profile = client.get(path, headers=headers).get_json()['user']
+        assert [feed['heading'] for feed in profile['feeds']] == ['DELET1']
+        assert profile['total_feeds'] == 1
+
+    assert cleanup.run_once() == (1, len(photo_keys(pictures[0])))
+    db.session.rollback()
+    assert db.session.get(Group, deleted_id) is None
+    assert db.session.query(Feed).filter(Feed.group_id == deleted_id).count() == 0
+    assert db.session.query(ChatMessage).filter(ChatMessage.group_id == deleted_id).count() == 0
+    assert db.session.query(PhotoDeletion).count() == 0
+    assert not any(key in s3.objects for key in photo_keys(pictures[0]))
+    assert db.session.query(Feed.picture).filter(Feed.group_id == groups[1].id).scalar() == pictures[1]
+    assert db.session.query(Comment).join(Feed).filter(Feed.group_id == groups[1].id).count() == 1
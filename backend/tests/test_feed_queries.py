@@ -0,0 +1,110 @@
+# tests/test_feed_queries.py
+"""
+A feed page costs a fixed number of queries, however many feeds, comments
+and likes it holds (see `build_feed_page`).
+"""
+import pytest
+
+PER_PAGE = 10
+
+@pytest.fixture(scope='module')
+def feed_group(app):
+    from models import Comment, Feed, Group, Like, User, db
+    with app.app_context():
+        users = [User(username=f'pages{i}', email=f'pages{i}@example.com', password='x') for i in range(3)]
+        db.session.add_all(users)
+        db.session.flush()
+        group = Group(name='Feed pages', code='PAGES1', description='', created_by=users[0].id)
+        db.session.add(group)
+        db.session.flush()
+        for user in users:
+            user.groups.append(group)
+        # One page and one more feed, so there is a next page
+        for i in range(PER_PAGE + 1):
+            feed = Feed(heading=f'Feed {i}', content='content', created_by=users[0].id, group_id=group.id,
+                        like_count=len(users) - 1)
+            db.session.add(feed)
+            db.session.flush()
+            for user in users[1:]:
+                db.session.add(Comment(feed_id=feed.id, comment='comment', user_id=user.id))
+                db.session.add(Like(feed_id=feed.id, user_id=user.id))
+        db.session.commit()
+        return {'user_ids': [user.id for user in users], 'usernames': [user.username for user in users],
+                'group_id': group.id, 'code': group.code}
+
+def add_comments(app, feed_group):
+    # Doubles the comments of every feed
+    from models import Comment, Feed, db
+    with app.app_context():
+        feeds = db.session.query(Feed.id).filter(Feed.group_id == feed_group['group_id']).all()
+        for (feed_id,) in feeds:
+            for user_id in feed_group['user_ids'][1:]:
+                db.session.add(Comment(feed_id=feed_id, comment='another comment', user_id=user_id))
+        db.session.commit()
+
+def feed_requests(feed_group):
+    """
+    Returns:
+        dict: name -> (index of the requesting user, path); user 0 wrote every feed.
+    """
+    code = feed_group['code']
+    author = feed_group['usernames'][0]
+    return {
+        'getAllFeeds (page)': (1, f'/getAllFeeds?groupCode={code}&page=1'),
+        'getAllFeeds (cursor)': (1, f'/getAllFeeds?groupCode={code}&cursor='),
+        'getUserData (own, page)': (0, f'/getUserData?username={author}'),
+        'getUserData (own, cursor)': (0, f'/getUserData?username={author}&cursor='),
+        'getUserData (member, page)': (1, f'/getUserData?username={author}&groupCode={code}'),
+        'getUserData (member, cursor)': (1, f'/getUserData?username={author}&groupCode={code}&cursor='),
+    }
+
+def count_page_queries(client, count_queries, headers, path):
+    with count_queries() as statements:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements), response.get_json()
+
+def page_feeds(body):
+    return body['user']['feeds'] if 'user' in body else body['feeds']
+
+# The profile's user (getUserData), the membership (group pages), the feed
+# version (getAllFeeds), the feed rows, their count (page mode) and one query
+# for the comments of the whole page
+EXPECTED_QUERIES = {
+    'getAllFeeds (page)': 5,
+    'getAllFeeds (cursor)': 4,
+    'getUserData (own, page)': 4,
+    'getUserData (own, cursor)': 3,
+    'getUserData (member, page)': 5,
+    'getUserData (member, cursor)': 4,
+}
+
+def test_feed_pages_use_a_fixed_number_of_queries(app, client, count_queries, auth_headers, feed_group):
+    headers = [auth_headers(user_id) for user_id in feed_group['user_ids']]
+    requests = feed_requests(feed_group)
+
+    before = {}
+    for name, (user, path) in requests.items():
+        before[name], body = count_page_queries(client, count_queries, headers[user], path)
+        feeds = page_feeds(body)
+        assert len(feeds) == PER_PAGE
+        assert all(len(feed['comments']) == 2 for feed in feeds)
+    assert before == EXPECTED_QUERIES
+
+    add_comments(app, feed_group)
+
+    after = {}
+    for name, (user, path) in requests.items():
+        after[name], body = count_page_queries(client, count_queries, headers[user], path)
+        assert all(len(feed['comments']) == 4 for feed in page_feeds(body))
+    assert after == before
+
+def test_next_cursor_page_uses_the_same_queries(client, count_queries, auth_headers, feed_group):
+    headers = auth_headers(feed_group['user_ids'][1])
+    path = f"/getAllFeeds?groupCode={feed_group['code']}&cursor="
+    first_count, first = count_page_queries(client, count_queries, headers, path)
+    assert first['next_cursor']
+    next_count, page = count_page_queries(client, count_queries, headers, path + first['next_cursor'])
+    assert len(page['feeds']) == 1
+    assert page['next_cursor'] is None
+    assert next_count == first_count
@@ -0,0 +1,48 @@
+# tests/test_login.py
+"""
+A login whose password checked out gets its token even when the stored
+hash is due for a rehash and the hasher has no room for it.
+"""
+import pytest
+
+@pytest.fixture
+def outdated_user(app, monkeypatch):
+    from passwords import PasswordHasher, hash_rounds, hasher
+    from models import User, db
+    # Hashed with fewer rounds than the app's, so a login wants to rehash it
+    monkeypatch.setattr(hasher, 'rounds', 5)
+    with app.app_context():
+        user = User(username='rehash0', email='rehash0@example.com', password=PasswordHasher(rounds=4, max_workers=0).hash('secret'))
+        db.session.add(user)
+        db.session.commit()
+        assert hash_rounds(user.password) == 4
+    yield 'rehash0'
+    with app.app_context():
+        User.query.filter_by(username='rehash0').delete()
+        db.session.commit()
+
+def stored_rounds(app, username):
+    from passwords import hash_rounds
+    from models import User
+    with app.app_context():
+        return hash_rounds(User.query.filter_by(username=username).first().password)
+
+def test_busy_hasher_skips_the_rehash(app, client, outdated_user, monkeypatch):
+    from passwords import PasswordHasherBusy, hasher
+
+    def busy(password):
+        raise PasswordHasherBusy('Too many logins in progress, try again shortly')
+
+    monkeypatch.setattr(hasher, 'hash', busy)
+    response = client.post('/login', json={'username': outdated_user, 'password': 'secret'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['access_token']
+    assert stored_rounds(app, outdated_user) == 4
+
+def test_login_rehashes_an_outdated_hash(app, client, outdated_user):
+    response = client.post('/login', json={'username': outdated_user, 'password': 'secret'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert stored_rounds(app, outdated_user) == 5
+
+def test_wrong_password_is_rejected(client, outdated_user):
+    assert client.post('/login', json={'username': outdated_user, 'password': 'wrong'}).status_code == 401
@@ -0,0 +1,17 @@
+# tests/test_query_plans.py
+"""
+No query of the main read endpoints may read a whole table; see
+benchmarks/query_plans.py, which also runs the check against PostgreSQL.
+"""
+from benchmarks.query_plans import check_plans, plan_table_names, record_statements
+
+def test_read_endpoints_use_indexes(app, db):
+    from models import ChatMessage, Comment, Feed, Group, Like, User
+    statements = record_statements(app, db, (User, Group, Feed, Comment, Like, ChatMessage))
+    assert statements
+
+    checked, failures = check_plans(db.engine, statements, plan_table_names(db))
+    assert checked > 0
+    assert not failures, '\n'.join(
+        f"FULL SCAN of {', '.join(scanned)} in {endpoint}: {' '.join(statement.split())}"
+        for endpoint, statement, scanned in failures)
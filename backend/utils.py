@@ -1,30 +1,65 @@
 import random
 import string
-import boto3
-from botocore.exceptions import NoCredentialsError
-from PIL import Image
-import io
-from flask import send_file
-import google.generativeai as genai
-from constants import GOOGLE_API_KEY
-
-genai.configure(api_key=GOOGLE_API_KEY)
-
-model = genai.GenerativeModel('gemini-pro')
+import json
+import base64
+from datetime import datetime
+import threading
+from instrumentation import timed
 
 def generate_random_code(length=6):
     return ''.join(random.choices(string.ascii_uppercase, k=length))
 
+def encode_cursor(timestamp, row_id):
+    """
+    Encode a keyset position as an opaque, URL-safe cursor string.
+    """
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Returns:
+        tuple: (timestamp, row_id)
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
 def get_s3_client(AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION):
+    import boto3
     s3 = boto3.client('s3', 
                   aws_access_key_id=AWS_ACCESS_KEY,
                   aws_secret_access_key=AWS_SECRET_KEY,
                   region_name=AWS_REGION)
     return s3
 
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3():
+    """
+    The shared S3 client, created on first use so importing the app stays cheap.
+    """
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            from constants import AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION
+            _s3_client = get_s3_client(AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION)
+        return _s3_client
+
 def upload_file_to_s3(s3, image_data, bucket_name, object_name):
+    from botocore.exceptions import NoCredentialsError
     try:
-        s3.put_object(Bucket=bucket_name, Key=object_name, Body=image_data, ContentType='image/jpeg')
+        with timed('s3'):
+            s3.put_object(Bucket=bucket_name, Key=object_name, Body=image_data, ContentType='image/jpeg')
         url = f"https://{bucket_name}.s3.amazonaws.com/{object_name}"
         return url
     except FileNotFoundError:
@@ -34,15 +69,18 @@ def upload_file_to_s3(s3, image_data, bucket_name, object_name):
 
 def get_file_from_s3(s3, bucket_name, object_name):
     try:
-        response = s3.get_object(Bucket=bucket_name, Key=object_name)
-        image_data = response['Body'].read()
+        with timed('s3'):
+            response = s3.get_object(Bucket=bucket_name, Key=object_name)
+            image_data = response['Body'].read()
         return image_data
     except Exception as e:
         print(f"Error getting file from S3 :{e}")
     
 def delete_file_from_s3(s3, bucket_name, object_name):
+    from botocore.exceptions import ClientError
     try:
-        response = s3.delete_object(Bucket=bucket_name, Key=object_name)
+        with timed('s3'):
+            response = s3.delete_object(Bucket=bucket_name, Key=object_name)
         return response
     except ClientError as e:
         error_code = e.response['Error']['Code']
@@ -55,7 +93,25 @@ def delete_file_from_s3(s3, bucket_name, object_name):
         print(f"An unexpected error occurred: {e}")
         return None
 
-def beautifyContent(text):
-    question = f"I am posting a photo on a social media platform. This is my caption: '{text}'. Fix grammatical and sytactical errors and beautify it and return within 300 characters. Also add couple of hashtags"
-    response = model.generate_content(question)
-    return response.text
+def delete_files_from_s3(s3, bucket_name, object_names):
+    """
+    Delete up to 1000 objects with a single DeleteObjects request. Missing
+    objects count as deleted.
+
+    Returns:
+        list: The names that could not be deleted.
+    """
+    try:
+        with timed('s3'):
+            response = s3.delete_objects(Bucket=bucket_name, Delete={
+                'Objects': [{'Key': object_name} for object_name in object_names],
+                'Quiet': True
+            })
+    except Exception as e:
+        print(f"Error deleting {len(object_names)} files from S3: {e}")
+        return list(object_names)
+    errors = response.get('Errors', [])
+    if errors:
+        print(f"Error deleting {len(errors)} of {len(object_names)} files from S3, e.g. {errors[0].get('Key')}: "
+              f"{errors[0].get('Code')} {errors[0].get('Message')}")
+    return [error['Key'] for error in errors]
@@ -9,6 +9,7 @@ import config from '../config';
 function AboutGroup() {
   const { groupCode } = useParams();
   const [groupInfo, setGroupInfo] = useState(null);
+  const [page, setPage] = useState(1);
   const [error, setError] = useState('');
   const [darkMode] = useState(() => {
     return localStorage.getItem('darkMode') === 'true';
@@ -24,19 +25,27 @@ function AboutGroup() {
       }
       
       const response = await axios.get(`${config.API_URL}/about/${groupCode}`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params: { page }
       });
       
-      setGroupInfo(response.data.group);
+      const group = response.data.group;
+      setGroupInfo(prevInfo => page > 1 && prevInfo
+        ? { ...group, members: [...prevInfo.members, ...group.members] }
+        : group);
     } catch (error) {
       console.error('Error fetching group data:', error);
       setError('Failed to fetch group information. Please try again.');
     }
-  }, [groupCode, navigate]);
+  }, [groupCode, page, navigate]);
+
+  useEffect(() => {
+    setPage(1);
+  }, [groupCode]);
 
   useEffect(() => {
     fetchGroupData();
-  }, [groupCode, fetchGroupData]);
+  }, [fetchGroupData]);
 
   const handleUserClick = (username) => {
     navigate(`/profile/${username}`, { state: { groupCode } });
@@ -66,7 +75,7 @@ function AboutGroup() {
           <p><strong>Description:</strong> {groupInfo.description}</p>
         </div>
         <div className="group-members">
-          <h2>Members</h2>
+          <h2>Members ({groupInfo.member_count})</h2>
           <ul>
             {groupInfo.members.map((member) => (
               <li key={member.id}>
@@ -76,6 +85,11 @@ function AboutGroup() {
               </li>
             ))}
           </ul>
+          {groupInfo.has_more_members && (
+            <button onClick={() => setPage(groupInfo.members_page + 1)} className="user-link">
+              Show more members
+            </button>
+          )}
         </div>
       </div>
       <div className="chat-section">
@@ -61,23 +61,22 @@ function AddFeed({onFeedAdded, groupCode}) {
                 return;
             }
 
-            let photoBase64 = null;
-            if (photo) {
-                photoBase64 = await convertToBase64(photo);
-            }
-
             // Sanitize the content before sending to the server
             const sanitizedContent = DOMPurify.sanitize(content);
 
-            await axios.post(`${config.API_URL}/addFeed`, {
-                heading: heading,
-                content: sanitizedContent,
-                photo: photoBase64,
-                groupCode: groupCode
-            }, {
+            // The photo is uploaded as a file, which the server streams to disk
+            const formData = new FormData();
+            formData.append('heading', heading);
+            formData.append('content', sanitizedContent);
+            formData.append('groupCode', groupCode);
+            if (photo) {
+                formData.append('photo', photo);
+            }
+
+            await axios.post(`${config.API_URL}/addFeed`, formData, {
                 headers: {
                     Authorization: `Bearer ${token}`,
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'multipart/form-data'
                 }
             });
 
@@ -92,7 +91,11 @@ function AddFeed({onFeedAdded, groupCode}) {
                 navigate('/login');
             }
             console.log('Error adding feed:', error);
-            setMessage('Failed to add post. Please try again.');
+            if (error.response && error.response.status === 413) {
+                setMessage('The photo is too large.');
+            } else {
+                setMessage('Failed to add post. Please try again.');
+            }
         }
     }
 
@@ -100,15 +103,6 @@ function AddFeed({onFeedAdded, groupCode}) {
         setPhoto(e.target.files[0]);
     }
 
-    const convertToBase64 = (file) => {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.readAsDataURL(file);
-            reader.onload = () => resolve(reader.result);
-            reader.onerror = error => reject(error);
-        });
-    }
-
     const handleExpand = () => {
         setIsExpanded(true);
     }
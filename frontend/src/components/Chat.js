@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import io from 'socket.io-client';
-import { getCurrentUser, isTokenExpired } from './Utils';
+import { getCurrentUser, isTokenExpired, syncGroupChanges } from './Utils';
 import { useNavigate } from 'react-router-dom';
 import '../css/Chat.css';
 import config from '../config';
@@ -11,9 +11,13 @@ function Chat({ groupCode }) {
     const [newMessage, setNewMessage] = useState('');
     const [error, setError] = useState(null);
     const [currentUser, setCurrentUser] = useState();
+    const [online, setOnline] = useState([]);
+    const [typing, setTyping] = useState([]);
     const navigate = useNavigate();
     const socketRef = useRef();
     const chatContainerRef = useRef();
+    const lastTypingRef = useRef(0);
+    const lastSeqRef = useRef(null);
 
     const [darkMode] = useState(() => {
         return localStorage.getItem('darkMode') === 'true';
@@ -42,14 +46,45 @@ function Chat({ groupCode }) {
                 setError('Failed to fetch messages. Please try again.');
             }
         };
+        const fetchPresence = async () => {
+            try {
+                const response = await axios.get(`${config.API_URL}/group/${groupCode}/presence`, {
+                    headers: { Authorization: `Bearer ${token}` }
+                });
+                setOnline(response.data.online);
+                setTyping(response.data.typing);
+            } catch (error) {
+                console.error('Error fetching presence:', error);
+            }
+        };
         fetchCurrentUser();
         fetchMessages();
 
-        socketRef.current = io(`${config.API_URL}`);
+        socketRef.current = io(`${config.API_URL}`, { auth: { token: localStorage.getItem('token') } });
 
-        socketRef.current.on('connect', () => {
+        lastSeqRef.current = null;
+        socketRef.current.on('connect', async () => {
             console.log('Socket connected in Chat');
-            socketRef.current.emit('join', { groupCode });
+            socketRef.current.emit('join', { groupCode }, fetchPresence);
+            // After a reconnect, catch up on the messages missed while disconnected
+            try {
+                const { seq, resync } = await syncGroupChanges(groupCode, lastSeqRef.current, socketRef.current);
+                lastSeqRef.current = Math.max(seq, lastSeqRef.current || 0);
+                if (resync) {
+                    fetchMessages();
+                }
+            } catch (error) {
+                console.error('Error syncing chat messages:', error);
+            }
+        });
+
+        // Live chat messages are sent before they are logged and carry no seq; the
+        // group's other events do, so a replay only repeats messages sent after the
+        // last of those (and is deduplicated below)
+        socketRef.current.onAny((event, data) => {
+            if (data && data.seq > lastSeqRef.current) {
+                lastSeqRef.current = data.seq;
+            }
         });
 
         socketRef.current.on('connect_error', (error) => {
@@ -58,13 +93,24 @@ function Chat({ groupCode }) {
         });
 
         socketRef.current.on('message', (message) => {
-            setMessages((prevMessages) => [...prevMessages, message]);
+            // Replayed messages may already be shown
+            setMessages((prevMessages) => prevMessages.some(m => m.id === message.id) ? prevMessages : [...prevMessages, message]);
+        });
+
+        // Presence changes arrive batched, at most once a second per group
+        socketRef.current.on('presence', ({ online: cameOnline = [], offline = [], typing: typists }) => {
+            setOnline((prevOnline) => [...prevOnline.filter(user => !offline.includes(user) && !cameOnline.includes(user)), ...cameOnline]);
+            if (typists) {
+                setTyping(typists);
+            }
         });
 
         return () => {
             console.log('Disconnecting Socket in Chat');
             socketRef.current.emit('leave', { groupCode });
             socketRef.current.off('message');
+            socketRef.current.off('presence');
+            socketRef.current.offAny();
             socketRef.current.disconnect();
         };
     }, [groupCode]);
@@ -90,6 +136,8 @@ function Chat({ groupCode }) {
                 );
                 setNewMessage('');
                 setError(null);
+                lastTypingRef.current = 0;
+                socketRef.current.emit('typing', { groupCode, typing: false });
             } catch (error) {
                 console.error('Error sending message:', error);
                 setError('Failed to send message. Please try again.');
@@ -97,6 +145,18 @@ function Chat({ groupCode }) {
         }
     };
 
+    const handleTyping = (e) => {
+        setNewMessage(e.target.value);
+        // The server forgets a typist after a few seconds, so repeat while typing
+        const now = Date.now();
+        if (now - lastTypingRef.current > 2000) {
+            lastTypingRef.current = now;
+            socketRef.current.emit('typing', { groupCode, typing: true });
+        }
+    };
+
+    const typists = typing.filter(user => user !== currentUser);
+
     const handleUserClick = (username) =>{
         console.log(username, groupCode)
         navigate(`/profile/${username}`, { state: { groupCode } });
@@ -106,6 +166,7 @@ function Chat({ groupCode }) {
         <div className={`chat-container ${darkMode ? 'dark-mode' : ''}`}>
             <div className="chat-header">
                 <h2>Group Chat</h2>
+                <span className="chat-online">{online.length} online</span>
             </div>
             {error && <p className="error-message">{error}</p>}
             <div className="chat-messages" ref={chatContainerRef}>
@@ -147,11 +208,14 @@ function Chat({ groupCode }) {
                     </div>
                 ))}
             </div>
+            {typists.length > 0 && (
+                <p className="chat-typing">{typists.join(', ')} {typists.length === 1 ? 'is' : 'are'} typing...</p>
+            )}
             <form onSubmit={sendChat} className="chat-input-container">
                 <input
                     type="text"
                     value={newMessage}
-                    onChange={(e) => setNewMessage(e.target.value)}
+                    onChange={handleTyping}
                     placeholder="Type a message..."
                     className="chat-input"
                 />
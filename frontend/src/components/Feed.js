@@ -2,7 +2,7 @@ import axios from 'axios';
 import io from 'socket.io-client';
 import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
-import { deletePost, getCurrentUser, isTokenExpired, showFeeds, updateFeed } from './Utils';
+import { deletePost, getCurrentUser, getLikes, isTokenExpired, likeChanges, showFeeds, syncGroupChanges, updateFeed } from './Utils';
 import config from '../config';
 import AddFeed from './AddFeed';
 import Chat from './Chat';
@@ -27,8 +27,10 @@ function Feed() {
     const [editPhoto, setEditPhoto] = useState(null);
     const [editPhotoPreview, setEditPhotoPreview] = useState(null);
     const [error, setError] = useState(null);
+    const [likedPosts, setLikedPosts] = useState({});
     // const intervalRef = useRef(null);
     const socketRef = useRef();
+    const lastSeqRef = useRef(null);
 
     const fetchPosts = useCallback(async () => {
         try {
@@ -51,6 +53,11 @@ function Feed() {
             setPosts(response.data.feeds);
             setTotalPages(response.data.pages);
             setError(null);
+            // Pages are shared by all members; the viewer's own likes come separately
+            if (response.data.feeds.length) {
+                const likes = await getLikes(response.data.feeds.map(feed => feed.id));
+                setLikedPosts(Object.fromEntries(likes.map(({ feed_id, liked }) => [feed_id, liked])));
+            }
         } catch (error) {
             console.error('Error fetching posts:', error);
             if (error.response && error.response.status === 401) {
@@ -66,11 +73,28 @@ function Feed() {
     }, [currentPage, groupCode, navigate]);
 
     useEffect(()=>{
-        socketRef.current = io(`${config.API_URL}`);
+        socketRef.current = io(`${config.API_URL}`, { auth: { token: localStorage.getItem('token') } });
 
-        socketRef.current.on('connect', () => {
+        lastSeqRef.current = null;
+        socketRef.current.on('connect', async () => {
             console.log('Socket connected in Feed');
             socketRef.current.emit('join', { groupCode });
+            // After a reconnect, catch up on the events missed while disconnected
+            try {
+                const { seq, resync } = await syncGroupChanges(groupCode, lastSeqRef.current, socketRef.current);
+                lastSeqRef.current = Math.max(seq, lastSeqRef.current || 0);
+                if (resync) {
+                    setRefreshTrigger(prev => prev + 1);
+                }
+            } catch (error) {
+                console.error('Error syncing group changes:', error);
+            }
+        });
+
+        socketRef.current.onAny((event, data) => {
+            if (data && data.seq > lastSeqRef.current) {
+                lastSeqRef.current = data.seq;
+            }
         });
 
         socketRef.current.on('connect_error', (error) => {
@@ -78,7 +102,7 @@ function Feed() {
         });
 
         socketRef.current.on('new_feed', (feed) => {
-            setPosts((prevPosts) => [feed, ...prevPosts]);
+            setPosts((prevPosts) => prevPosts.some(post => post.id === feed.id) ? prevPosts : [feed, ...prevPosts]);
         });
 
         socketRef.current.on('delete_feed', ({ feed_id }) => {
@@ -105,7 +129,7 @@ function Feed() {
 
         socketRef.current.on('new_comment', ({ feed_id, comment }) => {
             setPosts((prevPosts) => prevPosts.map(post => {
-                if (post.id === feed_id) {
+                if (post.id === feed_id && !post.comments.some(c => c.id === comment.id)) {
                     return {
                         ...post,
                         comments: [...post.comments, comment]
@@ -141,12 +165,13 @@ function Feed() {
             }));
         });
 
-        socketRef.current.on('like_feed', ({ feed_id, like_count, groupCode }) => {
+        socketRef.current.on('like_feed', (event) => {
+            const counts = Object.fromEntries(likeChanges(event).map(({ feed_id, like_count }) => [feed_id, like_count]));
             setPosts((prevPosts) => prevPosts.map(post => {
-                if (post.id === feed_id) {
+                if (post.id in counts) {
                     return {
                         ...post,
-                        likes: like_count
+                        likes: counts[post.id]
                     };
                 }
                 return post;
@@ -157,6 +182,7 @@ function Feed() {
                 console.log('Disconnecting Socket in Feed');
                 socketRef.current.emit('leave', { groupCode });
                 socketRef.current.off('message');
+                socketRef.current.offAny();
                 socketRef.current.disconnect();
             }
         };
@@ -318,7 +344,7 @@ function Feed() {
     const handleLike = async (feed_id) => {
         try {
           const token = localStorage.getItem('token');
-          await axios.post(`${config.API_URL}/toggleLike`, 
+          const response = await axios.post(`${config.API_URL}/toggleLike`, 
             { feed_id: feed_id, group_code:groupCode },
             {
               headers: {
@@ -327,6 +353,7 @@ function Feed() {
               }
             }
           );
+          setLikedPosts(prev => ({...prev, [feed_id]: response.data.liked}));
         } catch (error) {
           console.error('Error toggling like:', error);
         }
@@ -369,7 +396,8 @@ function Feed() {
                         handlePhotoChange,
                         editPhotoPreview,
                         handleLike,
-                        groupCode
+                        groupCode,
+                        likedPosts
                     )}
                 </div>
             </div>
@@ -53,7 +53,7 @@ function FeedGroups() {
     };
 
     useEffect(() =>{
-        socketRef.current = io(`${config.API_URL}`);
+        socketRef.current = io(`${config.API_URL}`, { auth: { token: localStorage.getItem('token') } });
 
         socketRef.current.on('connect', () => {
             console.log('Socket connected in FeedGroups');
@@ -69,7 +69,7 @@ function FeedGroups() {
 
         socketRef.current.on('update_group', (updatedGroup) => {
             setUserGroups((prevGroups) => prevGroups.map(group => 
-                group.code === updatedGroup.code ? updatedGroup : group
+                group.code === updatedGroup.code ? { ...group, ...updatedGroup } : group
             ));
         });
 
@@ -104,6 +104,20 @@ function FeedGroups() {
         socketRef.current.emit('join', { groupCode });
     };
 
+    const markGroupRead = async (groupCode) => {
+        setUserGroups(prevGroups => prevGroups.map(group =>
+            group.code === groupCode ? { ...group, unread_count: 0 } : group
+        ));
+        try {
+            const token = localStorage.getItem('token');
+            await axios.post(`${config.API_URL}/group/${groupCode}/read`, {}, {
+                headers: { Authorization: `Bearer ${token}` }
+            });
+        } catch (error) {
+            console.error('Error marking group as read:', error);
+        }
+    };
+
     const handleCreateGroup = async (e) => {
         e.preventDefault();
         setError('');
@@ -339,6 +353,7 @@ function FeedGroups() {
                                     className="feed-group-link"
                                     onClick={() => {
                                         setActiveGroup(group.code);
+                                        markGroupRead(group.code);
                                     }}
                                     key={group.code}
                               >
@@ -346,8 +361,11 @@ function FeedGroups() {
                                     <div className={`feed-group-avatar ${activeGroup === group.code ? 'active' : ''}`}>{getGroupInitials(group.name)}</div>
                                     <div className={`feed-group-info ${activeGroup === group.code ? 'active' : ''}`}>
                                         <h3>{group.name}</h3>
-                                        <p>{group.code}</p>
+                                        <p>{group.code} · {group.member_count} members · {group.feed_count} posts</p>
                                     </div>
+                                    {group.unread_count > 0 && (
+                                        <span className="feed-group-unread">{group.unread_count}</span>
+                                    )}
                                 </Link>
                             )}
                             <div className="group-menu" ref={menuRef}>
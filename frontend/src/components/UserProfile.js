@@ -3,7 +3,7 @@ import io from 'socket.io-client';
 import React, { useEffect, useState, useRef } from 'react';
 import { useNavigate, useParams, useLocation } from 'react-router-dom';
 import config from '../config';
-import { isTokenExpired, getUserProfile, showFeeds, deletePost, updateFeed, getCurrentUser } from './Utils';
+import { isTokenExpired, getUserProfile, showFeeds, deletePost, updateFeed, getCurrentUser, likeChanges } from './Utils';
 import Layout from './Layout';
 import '../css/Feed.css';
 
@@ -32,7 +32,7 @@ function UserProfile() {
       });
 
     useEffect(()=>{
-        socketRef.current = io(`${config.API_URL}`);
+        socketRef.current = io(`${config.API_URL}`, { auth: { token: localStorage.getItem('token') } });
 
         socketRef.current.on('connect', () => {
             console.log('Socket connected in User Profile');
@@ -95,12 +95,13 @@ function UserProfile() {
             }));
         });
 
-        socketRef.current.on('like_feed', ({ feed_id, like_count, groupCode }) => {
+        socketRef.current.on('like_feed', (event) => {
+            const counts = Object.fromEntries(likeChanges(event).map(({ feed_id, like_count }) => [feed_id, like_count]));
             setPosts((prevPosts) => prevPosts.map(post => {
-                if (post.id === feed_id) {
+                if (post.id in counts) {
                     return {
                         ...post,
-                        likes: like_count
+                        likes: counts[post.id]
                     };
                 }
                 return post;
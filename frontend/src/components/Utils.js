@@ -106,7 +106,8 @@ export const showFeeds = (
     handlePhotoChange,
     editPhotoPreview,
     handleLike,
-    groupCode
+    groupCode,
+    likedPosts = {}
 ) => {
     const toggleMenu = (event, postId) => {
         event.preventDefault();
@@ -223,7 +224,7 @@ export const showFeeds = (
                             )}
                         </>
                     )}
-                    <button onClick={() => handleLike(post.id)} className="action-button like-button">
+                    <button onClick={() => handleLike(post.id)} className={`action-button like-button${likedPosts[post.id] ? ' liked' : ''}`}>
                         <FontAwesomeIcon icon={faHeart} />
                         <span className="action-count">{post.likes}</span>
                     </button>
@@ -269,6 +270,21 @@ export const showFeeds = (
 };
 
 
+// Like counts of the given feeds and whether the current user liked each, in one request
+export const getLikes = async (feedIds) => {
+    const token = localStorage.getItem('token');
+    const response = await axios.get(`${config.API_URL}/getLikes`, {
+        params: { feed_ids: feedIds.join(',') },
+        headers: { Authorization: `Bearer ${token}` }
+    });
+    return response.data.likes;
+};
+
+// A like_feed event carries either one feed or, for batched updates, a `likes` list
+export const likeChanges = ({ feed_id, like_count, likes }) => {
+    return likes || [{ feed_id, like_count }];
+};
+
 export const deletePost = async(postId, token) => {
     try{
         await axios.delete(`${config.API_URL}/deleteFeed`, {
@@ -304,3 +320,27 @@ export const updateFeed = async (postId, formData, token) => {
         throw error;
     }
 };
+
+// Replays the group events missed since `since` through the socket's own handlers.
+// With `since` null it only reads the current sequence number; `resync` means the
+// missed events are no longer all logged and the caller has to refetch instead.
+export const syncGroupChanges = async (groupCode, since, socket) => {
+    const token = localStorage.getItem('token');
+    let seq = since;
+    let hasMore = true;
+    while (hasMore) {
+        const response = await axios.get(`${config.API_URL}/group/${groupCode}/changes`, {
+            params: since === null ? {} : { since: seq },
+            headers: { Authorization: `Bearer ${token}` }
+        });
+        if (since === null || response.data.resync) {
+            return { seq: response.data.seq, resync: since !== null };
+        }
+        response.data.changes.forEach(change => {
+            socket.listeners(change.event).forEach(listener => listener(change.data));
+        });
+        seq = response.data.seq;
+        hasMore = response.data.has_more;
+    }
+    return { seq, resync: false };
+};